@@ -0,0 +1,34 @@
+import csv
+import numpy as np
+import pytest
+from toto_analyzer import DrawHistory, WINNING_COLUMNS, ADDITIONAL_COLUMN, GROUP_PRIZES, NO_PRIZE
+
+def make_history(num_draws, seed=0, dates=True):
+    """Seeded random DrawHistory with varying group prizes, newest draw first."""
+    rng = np.random.default_rng(seed)
+    picks = np.argsort(rng.random((num_draws, 49)), axis=1)[:, :7] + 1
+    numbers = np.zeros((num_draws, 49), dtype=np.uint8)
+    np.put_along_axis(numbers, picks[:, :6] - 1, 1, axis=1)
+    payouts = GROUP_PRIZES[:NO_PRIZE] * rng.integers(1, 4, (num_draws, NO_PRIZE))
+    draw_dates = np.datetime64('2024-12-30') - np.arange(num_draws) * 3 if dates else None
+    return DrawHistory(draws=np.arange(num_draws, 0, -1),
+                       dates=draw_dates,
+                       numbers=numbers,
+                       additional=picks[:, 6].astype(np.uint8),
+                       payouts=payouts)
+
+def write_toto_csv(file_path, history):
+    """Write a DrawHistory in the ToTo.csv layout, with '$' and thousands separators in the prizes."""
+    with open(file_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Draw', 'Date'] + WINNING_COLUMNS + [ADDITIONAL_COLUMN]
+                        + [f'Group {group} Prize' for group in range(1, NO_PRIZE + 1)])
+        for row in range(len(history)):
+            date = history.dates[row].astype(object)
+            winning = (np.flatnonzero(history.numbers[row]) + 1).tolist()
+            writer.writerow([history.draws[row], date.strftime('%d/%m/%Y')] + winning
+                            + [history.additional[row]] + [f"${prize:,}" for prize in history.payouts[row]])
+
+@pytest.fixture
+def history():
+    return make_history(200, seed=1)
@@ -0,0 +1,240 @@
+import os
+from itertools import combinations
+from math import comb
+import numpy as np
+import pandas as pd
+import pytest
+import toto_analyzer
+from toto_backtest import run_backtest
+from conftest import make_history, write_toto_csv
+from toto_analyzer import (DrawHistory, drawn_incidence, rolling_window_counts, window_counts,
+                           rolling_first_seen_order, first_seen_order,
+                           load_draw_history, get_draw_numbers, calculate_weighted_frequencies,
+                           check_winning, score_tickets, system_group_counts, validate_draws, parse_dates,
+                           parse_payouts, MAX_REPORTED_PROBLEMS, CACHE_SUFFIX, CACHE_ARRAYS, GROUP_PRIZES, NO_PRIZE)
+
+@pytest.mark.parametrize('lookback', [1, 3, 7, 40])
+def test_rolling_window_counts_match_each_window(history, monkeypatch, lookback):
+    # Chunks shorter than the lookback make windows span several chunks
+    monkeypatch.setattr(toto_analyzer, 'WINDOW_CHUNK_ROWS', 16)
+    drawn = drawn_incidence(history)
+    plain, indexed, window_size = rolling_window_counts(drawn, lookback)
+    for row in range(len(history)):
+        start, stop = history.window(row, lookback)
+        expected_plain, expected_indexed = window_counts(drawn[start:stop])
+        assert window_size[row] == stop - start
+        assert (plain[row] == expected_plain).all()
+        assert (indexed[row] == expected_indexed).all()
+
+@pytest.mark.parametrize('lookback', [1, 3, 7, 40])
+def test_rolling_first_seen_order_matches_each_window(history, monkeypatch, lookback):
+    monkeypatch.setattr(toto_analyzer, 'WINDOW_CHUNK_ROWS', 16)
+    drawn = drawn_incidence(history)
+    _, _, window_size = rolling_window_counts(drawn, lookback)
+    order = rolling_first_seen_order(drawn, history.additional, window_size)
+    # The oldest draw has an empty window
+    for row in range(len(history) - 1):
+        start, stop = history.window(row, lookback)
+        assert (order[row] == first_seen_order(drawn[start:stop], history.additional[start:stop])).all()
+
+def assert_same_draws(loaded, history):
+    assert (loaded.draws == history.draws).all()
+    assert (loaded.dates == history.dates).all()
+    assert (loaded.numbers == history.numbers).all()
+    assert (loaded.additional == history.additional).all()
+    assert (loaded.payouts == history.payouts).all()
+
+def test_cache_rebuilt_when_csv_changes(history, tmp_path):
+    file_path = str(tmp_path / 'ToTo.csv')
+    write_toto_csv(file_path, history)
+    assert_same_draws(load_draw_history(file_path), history)
+    cached = load_draw_history(file_path)
+    assert isinstance(cached.numbers, np.memmap)
+    assert_same_draws(cached, history)
+    
+    corrected = make_history(200, seed=1)
+    corrected.additional = corrected.additional.copy()
+    corrected.additional[0] = next(n for n in range(1, 50) if not corrected.numbers[0, n - 1]
+                                   and n != corrected.additional[0])
+    write_toto_csv(file_path, corrected)
+    assert_same_draws(load_draw_history(file_path), corrected)
+    # Arrays mapped before the rebuild still hold the old draws
+    assert_same_draws(cached, history)
+    assert sorted(os.listdir(file_path + CACHE_SUFFIX)) == sorted([name + '.npy' for name in CACHE_ARRAYS]
+                                                                   + ['meta.json'])
+
+def loop_weighted_frequencies(history, target_draw, lookback, least_weight):
+    """The original iterrows loop: linspace weights summed per drawn number."""
+    position = history.position(target_draw)
+    start, stop = history.window(position, lookback)
+    frequencies = {}
+    for weight, row in zip(np.linspace(1.0, least_weight, stop - start), range(start, stop)):
+        winning, additional = get_draw_numbers(history, row)
+        for number in winning + [additional]:
+            frequencies[number] = frequencies.get(number, 0.0) + weight
+    return frequencies
+
+@pytest.mark.parametrize('least_weight', [0.1, 0.5, 1.0])
+@pytest.mark.parametrize('lookback', [1, 4, 30])
+def test_weighted_frequencies_match_loop(history, lookback, least_weight):
+    for target_draw in (200, 120, 2, 1):
+        expected = loop_weighted_frequencies(history, target_draw, lookback, least_weight)
+        frequencies = calculate_weighted_frequencies(history, target_draw, lookback, least_weight)
+        assert list(frequencies) == list(expected)
+        np.testing.assert_allclose(list(frequencies.values()), list(expected.values()), rtol=1e-12)
+
+def test_draw_history_from_frame(history, tmp_path):
+    file_path = tmp_path / 'ToTo.csv'
+    write_toto_csv(file_path, history)
+    assert_same_draws(DrawHistory.from_frame(pd.read_csv(file_path)), history)
+
+def test_draw_history_sorts_shuffled_rows_with_gap(history, tmp_path):
+    kept = ~np.isin(history.draws, [100, 101, 102])
+    gapped = DrawHistory(draws=history.draws[kept], dates=history.dates[kept], numbers=history.numbers[kept],
+                         additional=history.additional[kept], payouts=history.payouts[kept])
+    file_path = tmp_path / 'ToTo.csv'
+    write_toto_csv(file_path, gapped)
+    header, *rows = file_path.read_text().splitlines()
+    np.random.default_rng(0).shuffle(rows)
+    file_path.write_text('\n'.join([header] + rows) + '\n')
+    
+    loaded = load_draw_history(str(file_path), use_cache=False)
+    assert_same_draws(loaded, gapped)
+    assert loaded.missing_draws.tolist() == [100, 101, 102]
+    assert loaded.position(200) == 0 and loaded.position(103) == 97 and loaded.position(99) == 98
+    assert 101 not in loaded and 10.5 not in loaded and 10.0 in loaded
+    with pytest.raises(KeyError):
+        loaded.position(10.5)
+    
+    shuffled = run_backtest(loaded, 5, least_weight=0.4)[0]
+    ordered = run_backtest(gapped, 5, least_weight=0.4)[0]
+    assert list(shuffled) == list(ordered)
+
+def ladder_prize(picked, winning, additional):
+    """The original if-ladder of check_winning."""
+    matches = len(set(picked) & set(winning))
+    has_additional = additional in picked
+    if matches == 6:
+        return 1000000
+    elif matches == 5 and has_additional:
+        return 100000
+    elif matches == 5:
+        return 2000
+    elif matches == 4 and has_additional:
+        return 400
+    elif matches == 4:
+        return 50
+    elif matches == 3 and has_additional:
+        return 25
+    elif matches == 3:
+        return 10
+    return 0
+
+WINNING = [3, 11, 19, 27, 35, 43]
+ADDITIONAL = 49
+# A ticket with every possible number of matches, with and without the additional number
+LOSING = [1, 2, 4, 5, 6, 7]
+TICKETS = [sorted(WINNING[:matches] + [ADDITIONAL] * has_additional + LOSING[:6 - matches - has_additional])
+           for matches in range(7) for has_additional in range(2) if matches + has_additional <= 6]
+
+def test_scoring_matches_if_ladder():
+    tickets = np.array(TICKETS, dtype=np.uint8)
+    numbers = np.zeros(49, dtype=np.uint8)
+    numbers[np.array(WINNING) - 1] = 1
+    expected = [ladder_prize(ticket, WINNING, ADDITIONAL) for ticket in TICKETS]
+    assert sorted(set(expected)) == [0, 10, 25, 50, 400, 2000, 100000, 1000000]
+    assert [check_winning(ticket, WINNING, ADDITIONAL) for ticket in TICKETS] == expected
+    assert score_tickets(tickets, numbers, ADDITIONAL).tolist() == expected
+
+def test_scoring_pays_each_draws_group_prize():
+    tickets = np.array(TICKETS, dtype=np.uint8)
+    numbers = np.zeros(49, dtype=np.uint8)
+    numbers[np.array(WINNING) - 1] = 1
+    payouts = np.array([3000000, 150000, 2500, 450, 50, 25, 10])
+    by_fixed_prize = dict(zip(GROUP_PRIZES[:NO_PRIZE].tolist(), payouts.tolist()))
+    expected = [by_fixed_prize.get(ladder_prize(ticket, WINNING, ADDITIONAL), 0) for ticket in TICKETS]
+    assert [check_winning(ticket, WINNING, ADDITIONAL, payouts) for ticket in TICKETS] == expected
+    assert score_tickets(tickets, numbers, ADDITIONAL, payouts).tolist() == expected
+
+@pytest.mark.parametrize('num_picks', range(7, 13))
+def test_system_entries_match_expanded_combinations(num_picks):
+    losing = [n for n in range(1, 49) if n not in WINNING][:num_picks]
+    entries = [sorted(WINNING[:matches] + [ADDITIONAL] * has_additional
+                      + losing[:num_picks - matches - has_additional])
+               for matches in range(7) for has_additional in range(2)]
+    expected = [sum(ladder_prize(combination, WINNING, ADDITIONAL) for combination in combinations(entry, 6))
+                for entry in entries]
+    numbers = np.zeros(49, dtype=np.uint8)
+    numbers[np.array(WINNING) - 1] = 1
+    assert [check_winning(entry, WINNING, ADDITIONAL) for entry in entries] == expected
+    assert score_tickets(np.array(entries, dtype=np.uint8), numbers, ADDITIONAL).tolist() == expected
+    
+    # Every combination of a possible outcome is counted once
+    counts = system_group_counts(num_picks)
+    possible = [(matches, has_additional) for matches in range(7) for has_additional in range(2)
+                if matches + has_additional <= num_picks]
+    assert all(counts[outcome].sum() == comb(num_picks, 6) for outcome in possible)
+
+def test_validate_draws_lists_every_problem():
+    draws = np.array([12, 11, 11, 10])
+    values = np.array([[1, 2, 3, 4, 5, 6, 7],
+                       [1, 2, 3, 4, 5, 50, 7],
+                       [1, 2, 3, 4, 5, 6, np.nan],
+                       [8, 8, 9, 10, 11, 12, 9]], dtype=np.float32)
+    with pytest.raises(ValueError) as error:
+        validate_draws(draws, values, 'ToTo.csv')
+    assert str(error.value).splitlines() == [
+        "3 invalid draw(s) in ToTo.csv:",
+        "  draw 11: Winning Number 6 is 50, not a number from 1-49",
+        "  draw 10: 8, 9 drawn more than once",
+        "  draw 11: appears 2 times"
+    ]
+    # A missing number is not a problem
+    validate_draws(draws[[0, 2]], values[[0, 2]])
+
+def test_validate_draws_counts_problems_beyond_the_limit():
+    values = np.tile(np.array([1, 2, 3, 4, 5, 6, 0], dtype=np.float32), (15, 1))
+    values[:, 0] = 2.5
+    with pytest.raises(ValueError) as error:
+        validate_draws(np.arange(15, 0, -1), values)
+    lines = str(error.value).splitlines()
+    assert lines[0] == "15 invalid draw(s) in data:"
+    assert lines[-1] == "  ... and 5 more"
+    assert len(lines) == 2 + MAX_REPORTED_PROBLEMS
+
+def test_loader_rejects_invalid_csv(history, tmp_path):
+    file_path = tmp_path / 'ToTo.csv'
+    write_toto_csv(file_path, history)
+    lines = file_path.read_text().splitlines()
+    fields = lines[5].split(',')
+    fields[3] = '77'
+    lines[5] = ','.join(fields)
+    file_path.write_text('\n'.join(lines) + '\n')
+    with pytest.raises(ValueError, match=r"draw 196: Winning Number 2 is 77"):
+        load_draw_history(str(file_path))
+
+def test_parse_dates():
+    dates = parse_dates(['31/01/2024', '29/02/2024', '01/12/1999'])
+    assert dates.tolist() == np.array(['2024-01-31', '2024-02-29', '1999-12-01'], dtype='datetime64[D]').tolist()
+    assert parse_dates(['1/2/2024']).tolist() == [np.datetime64('2024-02-01', 'D').tolist()]
+    with pytest.raises(ValueError):
+        parse_dates(['30/02/2024'])
+    # Longer strings are not truncated into valid dates
+    for trailing in ('01/01/20245', '01/01/2024junk'):
+        with pytest.raises(ValueError):
+            parse_dates(['31/01/2024', trailing])
+
+def test_parse_payouts_strips_formatting():
+    data = pd.DataFrame({
+        'Group 1 Prize': ['$1,234,567', ' $2,000,000 ', '-'],
+        'Division 2 Prize': ['$85,000.40', '', '$0'],
+        'Group 4 Prize': [420, 380.6, np.nan],
+        'Group 9 Prize': [1, 2, 3]
+    })
+    payouts = parse_payouts(data)
+    assert payouts.shape == (3, NO_PRIZE)
+    assert payouts[:, 0].tolist() == [1234567, 2000000, GROUP_PRIZES[0]]
+    assert payouts[:, 1].tolist() == [85000, GROUP_PRIZES[1], GROUP_PRIZES[1]]
+    assert payouts[:, 3].tolist() == [420, 381, GROUP_PRIZES[3]]
+    # Groups without a column keep their fixed prize
+    assert (payouts[:, [2, 4, 5, 6]] == GROUP_PRIZES[[2, 4, 5, 6]]).all()
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from toto_analyzer import DrawHistory, drawn_incidence, check_winning
+from toto_backtest import (run_backtest, iter_backtest, BacktestResults, backtest_positions,
+                          decayed_frequency_blocks)
+
+def test_results_slice(history):
+    results, _, _, _ = run_backtest(history, 5)
+    tail = results[-10:]
+    assert isinstance(tail, BacktestResults)
+    assert list(tail) == list(results)[-10:]
+    assert tail.total_cost == 10 * results.cost
+
+@pytest.mark.parametrize('num_picks', range(6, 13))
+@pytest.mark.parametrize('lookback', [1, 2, 5])
+def test_engines_agree(history, lookback, num_picks):
+    rolling, _, rolling_prize, _ = run_backtest(history, lookback, num_picks=num_picks)
+    per_draw, _, per_draw_prize, _ = run_backtest(history, lookback, num_picks=num_picks, engine='per_draw')
+    assert (rolling.tickets == per_draw.tickets).all()
+    assert (rolling.prizes == per_draw.prizes).all()
+    assert rolling_prize == per_draw_prize
+
+def naive_decayed_frequencies(history, position, half_life):
+    """Sum of 0.5 ** (age / half_life) over the earlier draws each number appears in."""
+    frequencies = np.zeros(49)
+    drawn = drawn_incidence(history)
+    for age, row in enumerate(range(position + 1, len(history))):
+        frequencies += drawn[row] * 0.5 ** (age / half_life)
+    return frequencies
+
+@pytest.mark.parametrize('half_lives', [[3.0], [0.5, 10.0, 150.0]])
+def test_decay_matches_naive_weighted_sum(history, half_lives):
+    positions = np.array([150, 0, 90, 189])
+    for rows, frequencies, order in decayed_frequency_blocks(history, half_lives, positions):
+        for idx, row in enumerate(rows):
+            for half_life, block in zip(half_lives, frequencies):
+                expected = naive_decayed_frequencies(history, positions[row], half_life)
+                np.testing.assert_allclose(block[idx], expected, rtol=1e-9)
+
+def test_decayed_backtest_picks_highest_naive_frequencies(history):
+    results, _, _, _ = run_backtest(history, 10, half_life=8.0)
+    for result, position in zip(results, backtest_positions(history, 10)):
+        frequencies = np.round(naive_decayed_frequencies(history, position, 8.0), 9)
+        picked = np.array(result['Suggested_Numbers']) - 1
+        assert frequencies[picked].min() >= np.delete(frequencies, picked).max()
+
+def test_backtest_pays_each_draws_prizes(history):
+    results, _, total_prize, _ = run_backtest(history, 3, num_picks=7)
+    for result in results:
+        position = history.position(result['Draw'])
+        assert result['Prize'] == check_winning(result['Suggested_Numbers'], result['Winning_Numbers'],
+                                                result['Additional_Number'], history.payouts[position])
+    fixed = DrawHistory(history.draws, history.dates, history.numbers, history.additional)
+    assert run_backtest(fixed, 3, num_picks=7)[2] != total_prize
+
+def test_half_life_rejects_other_strategies(history):
+    with pytest.raises(ValueError, match="cannot be combined with gap"):
+        run_backtest(history, 10, half_life=8.0, strategy='gap')
+
+@pytest.mark.parametrize('options', [{}, {'num_picks': 8}, {'half_life': 5.0}, {'strategy': 'gap'},
+                                     {'engine': 'per_draw'}])
+def test_chunks_match_whole_backtest(history, options):
+    results, total_cost, total_prize, wins = run_backtest(history, 4, 170, 20, **options)
+    chunks = list(iter_backtest(history, 4, 170, 20, chunk_size=40, **options))
+    assert [len(chunk) for chunk, _, _, _ in chunks] == [40, 40, 40, 31]
+    assert np.concatenate([chunk.draws for chunk, _, _, _ in chunks]).tolist() == results.draws.tolist()
+    assert (np.concatenate([chunk.tickets for chunk, _, _, _ in chunks]) == results.tickets).all()
+    assert (np.concatenate([chunk.prizes for chunk, _, _, _ in chunks]) == results.prizes).all()
+    assert chunks[-1][1:] == (total_cost, total_prize, wins)
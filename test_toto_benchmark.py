@@ -0,0 +1,48 @@
+import json
+import sys
+import pytest
+import toto_benchmark
+from toto_analyzer import load_draw_history
+from toto_benchmark import generate_history, run_benchmarks, save_benchmarks, compare_benchmarks
+
+def test_generated_history_loads(tmp_path):
+    file_path = str(tmp_path / 'ToTo.csv')
+    generate_history(50, seed=2).to_csv(file_path, index=False)
+    history = load_draw_history(file_path)
+    assert history.draws.tolist() == list(range(50, 0, -1))
+    assert (history.numbers.sum(axis=1) == 6).all()
+    assert (generate_history(50, seed=2) == generate_history(50, seed=2)).all().all()
+
+def test_compare_flags_slower_benchmarks(tmp_path):
+    baseline_path = str(tmp_path / 'baseline.json')
+    results = run_benchmarks(sizes=[60], repeats=1, only=['run_backtest', 'read_toto_data'])
+    assert [(r['benchmark'], r['size']) for r in results] == [('read_toto_data', 60), ('run_backtest', 60)]
+    save_benchmarks(results, baseline_path, seed=0, repeats=1)
+    
+    current = [{**result, 'best': result['best'] * 2} for result in results]
+    current.append({'benchmark': 'unknown', 'size': 60, 'best': 1.0})
+    comparison = compare_benchmarks(current, baseline_path, threshold=1.5, min_seconds=0)
+    assert comparison['Benchmark'].tolist() == ['read_toto_data', 'run_backtest']
+    assert comparison['Ratio'].tolist() == pytest.approx([2.0, 2.0])
+    assert comparison['Regression'].all()
+    # Slowdowns of timings under min_seconds are noise
+    assert not compare_benchmarks(current, baseline_path, threshold=1.5, min_seconds=1e6)['Regression'].any()
+    assert not compare_benchmarks(current, baseline_path, threshold=2.5, min_seconds=0)['Regression'].any()
+
+def test_compare_mode_exits_on_regression(tmp_path, monkeypatch, capsys):
+    baseline_path = str(tmp_path / 'baseline.json')
+    options = ['--sizes', '60', '--repeats', '1', '--only', 'run_backtest']
+    monkeypatch.setattr(sys, 'argv', ['toto_benchmark.py', *options, '--output', baseline_path])
+    toto_benchmark.main()
+    with open(baseline_path) as f:
+        report = json.load(f)
+    report['results'][0]['best'] = 1e-9
+    with open(baseline_path, 'w') as f:
+        json.dump(report, f)
+    
+    monkeypatch.setattr(sys, 'argv', ['toto_benchmark.py', *options, '--output', str(tmp_path / 'current.json'),
+                                      '--compare', baseline_path, '--min-time', '0'])
+    with pytest.raises(SystemExit) as exit_info:
+        toto_benchmark.main()
+    assert exit_info.value.code == 1
+    assert "1 regression(s)" in capsys.readouterr().out
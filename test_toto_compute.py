@@ -0,0 +1,20 @@
+import json
+import sys
+import toto_compute
+from conftest import write_toto_csv
+from toto_profile import disable_profiling
+
+def test_profiled_run_writes_only_json_to_stdout(history, tmp_path, monkeypatch, capsys):
+    file_path, profile_path = tmp_path / 'ToTo.csv', tmp_path / 'profile.json'
+    write_toto_csv(file_path, history)
+    monkeypatch.setattr(sys, 'argv', ['toto_compute.py', '--file', str(file_path), '--lookbacks', '3',
+                                      '--weights', '0.1', '0.5', '--profile', str(profile_path)])
+    try:
+        toto_compute.main()
+    finally:
+        disable_profiling()
+    out, err = capsys.readouterr()
+    results = json.loads(out)
+    assert [(row['Lookback'], row['Least_Weight']) for row in results] == [(3, 0.1), (3, 0.5)]
+    assert "Profile:" in err
+    assert 'evaluate_lookback' in json.loads(profile_path.read_text())['stages']
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import pytest
+import toto_backtest
+import toto_optimize
+from conftest import make_history
+from toto_backtest import run_backtest, evaluate_lookback
+from toto_analyzer import DrawHistory
+from toto_optimize import (test_parameters as run_sweep, walk_forward, adaptive_search, save_results,
+                           load_results, update_parameters, bootstrap_intervals, CI_COLUMNS, CI_METRICS)
+
+# A small grid: 4 lookbacks x 4 weights
+GRID = {'lookback_range': (1, 4), 'weight_range': (0.1, 1), 'weight_step': 0.3}
+
+def interrupt_after(monkeypatch, calls):
+    """Make the sweep stop like a killed run after evaluating calls lookbacks."""
+    evaluate_cells = toto_optimize.evaluate_cells
+    done = []
+    
+    def interrupted(*args, **kwargs):
+        if len(done) == calls:
+            raise KeyboardInterrupt
+        done.append(None)
+        return evaluate_cells(*args, **kwargs)
+    monkeypatch.setattr(toto_optimize, 'evaluate_cells', interrupted)
+
+def test_resume_after_truncated_checkpoint(history, tmp_path, monkeypatch):
+    expected = run_sweep(history, **GRID)
+    checkpoint_file = str(tmp_path / 'checkpoint.csv')
+    monkeypatch.setattr(toto_optimize, 'CHECKPOINT_ROWS', 1)
+    
+    with monkeypatch.context() as patch:
+        interrupt_after(patch, 2)
+        with pytest.raises(KeyboardInterrupt):
+            run_sweep(history, checkpoint_file=checkpoint_file, **GRID)
+    
+    # The run died while writing its last row
+    with open(checkpoint_file, 'rb+') as f:
+        f.truncate(len(f.read()) - 7)
+    
+    with monkeypatch.context() as patch:
+        # Redo the lost cell and lookback 3, then die again
+        interrupt_after(patch, 2)
+        with pytest.raises(KeyboardInterrupt):
+            run_sweep(history, checkpoint_file=checkpoint_file, **GRID)
+    assert len(pd.read_csv(checkpoint_file)) == 3 * 4
+    
+    resumed = run_sweep(history, checkpoint_file=checkpoint_file, **GRID)
+    pd.testing.assert_frame_equal(resumed, expected)
+
+def net_profit(history, lookback, least_weight, latest_draw, earliest_draw):
+    _, total_cost, total_prize, _ = run_backtest(history, lookback, latest_draw, earliest_draw, least_weight)
+    return total_prize - total_cost
+
+@pytest.mark.parametrize('expanding', [True, False])
+def test_walk_forward_plays_best_training_cell(expanding):
+    history = make_history(200, seed=4, dates=False)
+    grid = {'lookback_range': (1, 3), 'weight_range': (0.1, 1), 'weight_step': 0.45}
+    out_of_sample, folds = walk_forward(history, train_draws=60, test_draws=40, expanding=expanding, **grid)
+    assert len(folds) == 4
+    assert out_of_sample['Date'].isna().all()
+    cells = [(lookback, weight) for lookback in (1, 2, 3) for weight in (0.1, 0.55, 1.0)]
+    for fold in folds.to_dict('records'):
+        train_end = fold['Test_Start_Draw'] - 1
+        train = [net_profit(history, lookback, weight, train_end, fold['Train_Start_Draw'])
+                 for lookback, weight in cells]
+        assert fold['Train_Net_Profit'] == max(train)
+        assert fold['Test_Net_Profit'] == net_profit(history, fold['Lookback'], fold['Least_Weight'],
+                                                     fold['Test_End_Draw'], fold['Test_Start_Draw'])
+    assert out_of_sample['Cumulative_Profit'].iat[-1] == folds['Test_Net_Profit'].sum()
+
+def test_walk_forward_plays_strategy(history):
+    _, folds = walk_forward(history, train_draws=80, test_draws=60, lookback_range=(2, 3),
+                            weight_range=(0.5, 1), weight_step=0.5, strategy='hot')
+    for fold in folds.to_dict('records'):
+        _, total_cost, total_prize, _ = run_backtest(history, fold['Lookback'], fold['Test_End_Draw'],
+                                                     fold['Test_Start_Draw'], fold['Least_Weight'],
+                                                     strategy='hot')
+        assert fold['Test_Net_Profit'] == total_prize - total_cost
+
+def test_adaptive_search_finalists_match_full_backtests(history):
+    results, trace = adaptive_search(history, lookback_range=(1, 30), n_candidates=27, eta=3,
+                                     refine_rounds=1, n_final=3)
+    assert len(results) == 3
+    assert trace['Lookback'].between(1, 30).all()
+    # No candidate is scored on more draws than the pool playable with the longest lookback
+    pool = len(history) - 30
+    assert (trace.groupby(['Lookback', 'Least_Weight'])['New_Draws'].sum() <= pool).all()
+    for row in results.to_dict('records'):
+        assert row['Net_Profit'] == net_profit(history, row['Lookback'], row['Least_Weight'], None, None)
+
+@pytest.mark.parametrize('lookback', [1, 7])
+def test_evaluate_lookback_paths_agree(history, monkeypatch, lookback):
+    positions = np.arange(3, 180, 4)
+    rolling = evaluate_lookback(history, lookback, [0.1, 0.7], positions)
+    monkeypatch.setattr(toto_backtest, 'MAX_DIRECT_POSITIONS', len(positions) + 1)
+    direct = evaluate_lookback(history, lookback, [0.1, 0.7], positions)
+    assert (rolling[0] == direct[0]).all()
+    assert (rolling[1] == direct[1]).all()
+
+@pytest.mark.parametrize('num_picks', [6, 8])
+def test_grid_matches_backtest_of_each_cell(history, num_picks):
+    results = run_sweep(history, num_picks=num_picks, **GRID)
+    assert len(results) == 4 * 4
+    for row in results.to_dict('records'):
+        backtest, total_cost, total_prize, wins = run_backtest(history, row['Lookback'],
+                                                               least_weight=row['Least_Weight'],
+                                                               num_picks=num_picks)
+        assert row['Total_Draws'] == len(backtest)
+        assert row['Total_Cost'] == total_cost
+        assert row['Total_Prize'] == total_prize
+        assert row['Total_Wins'] == wins
+
+def test_incremental_update_matches_full_rerun(history, tmp_path):
+    results_file, state_file = str(tmp_path / 'results.csv'), str(tmp_path / 'results.json')
+    older = DrawHistory(history.draws[30:], history.dates[30:], history.numbers[30:],
+                        history.additional[30:], history.payouts[30:])
+    save_results(run_sweep(older, **GRID), older, results_file=results_file, state_file=state_file)
+    
+    saved, last_draw, num_picks, strategy = load_results(history, results_file, state_file)
+    updated, new_draws = update_parameters(history, saved, last_draw, num_picks, strategy)
+    assert new_draws == 30
+    pd.testing.assert_frame_equal(updated, run_sweep(history, **GRID), check_dtype=False)
+
+def test_load_results_rejects_corrected_draws(history, tmp_path):
+    results_file, state_file = str(tmp_path / 'results.csv'), str(tmp_path / 'results.json')
+    save_results(run_sweep(history, **GRID), history, results_file=results_file, state_file=state_file)
+    history.payouts = history.payouts.copy()
+    history.payouts[150, 0] += 1
+    with pytest.raises(ValueError, match="have changed"):
+        load_results(history, results_file, state_file)
+
+def test_bootstrap_intervals_cover_every_cell(history):
+    results = run_sweep(history, **GRID)
+    intervals = bootstrap_intervals(history, results, n_samples=200, block_size=10)
+    assert list(intervals.columns) == list(results.columns) + CI_COLUMNS
+    assert len(intervals) == len(results)
+    assert not intervals[CI_COLUMNS].isna().any().any()
+    for metric in CI_METRICS:
+        assert (intervals[f'{metric}_Low'] <= intervals[f'{metric}_High']).all()
+    # The same seed gives the same resamples
+    pd.testing.assert_frame_equal(intervals, bootstrap_intervals(history, results, n_samples=200, block_size=10))
+
+def test_parallel_sweep_matches_serial(history):
+    pd.testing.assert_frame_equal(run_sweep(history, workers=2, **GRID), run_sweep(history, **GRID))
+
+def test_parallel_sweep_of_empty_grid(history):
+    assert run_sweep(history, lookback_range=(5, 4), workers=2).empty
@@ -0,0 +1,63 @@
+import argparse
+import io
+import json
+import time
+import numpy as np
+import pytest
+from toto_profile import (profiled, stage, enable_profiling, disable_profiling, profile_stats, format_profile,
+                          write_profile, add_profile_argument)
+
+@profiled
+def outer(count):
+    for _ in range(count):
+        inner()
+    with stage('allocate'):
+        block = np.ones(2**20, dtype=np.uint8)
+    return int(block.sum())
+
+@profiled
+def inner():
+    time.sleep(0.01)
+
+@pytest.fixture
+def profiling():
+    enable_profiling()
+    yield
+    disable_profiling()
+
+def test_stages_record_calls_times_and_memory(profiling):
+    assert outer(3) == 2**20
+    outer(2)
+    stages = profile_stats()['stages']
+    assert {name: stats['calls'] for name, stats in stages.items()} == {'outer': 2, 'inner': 5, 'allocate': 2}
+    assert stages['inner']['seconds'] >= 0.05
+    assert stages['inner']['self_seconds'] == pytest.approx(stages['inner']['seconds'])
+    # Nested stages count towards the total time but not the self time of outer
+    assert stages['outer']['seconds'] >= stages['inner']['seconds'] + stages['allocate']['seconds']
+    assert stages['outer']['self_seconds'] < stages['outer']['seconds'] - 0.05
+    assert stages['allocate']['peak_bytes'] >= 2**20
+    assert stages['outer']['peak_bytes'] >= stages['allocate']['peak_bytes']
+
+def test_nothing_recorded_while_disabled():
+    enable_profiling(trace_memory=False)
+    disable_profiling()
+    outer(1)
+    assert profile_stats()['stages'] == {}
+
+def test_profile_written_as_table_and_json(profiling, tmp_path):
+    outer(1)
+    stream = io.StringIO()
+    write_profile(tmp_path / 'profile.json', stream)
+    table = stream.getvalue()
+    assert table.index('outer') < table.index('allocate')
+    saved = json.loads((tmp_path / 'profile.json').read_text())
+    assert saved['memory_traced']
+    assert saved['stages']['inner']['calls'] == 1
+    assert format_profile(saved).splitlines()[-1].startswith("Total wall time:")
+
+def test_profile_argument():
+    parser = argparse.ArgumentParser()
+    add_profile_argument(parser, 'toto_example')
+    assert parser.parse_args([]).profile is None
+    assert parser.parse_args(['--profile']).profile == 'toto_example_profile.json'
+    assert parser.parse_args(['--profile', 'run.json']).profile == 'run.json'
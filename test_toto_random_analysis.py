@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+from toto_analyzer import popcount
+from toto_random_analysis import simulate_null_distribution, random_ticket_masks, random_entry_baseline
+
+@pytest.mark.parametrize('num_picks', [6, 10])
+def test_random_tickets_pick_distinct_numbers(num_picks):
+    masks = random_ticket_masks(np.random.default_rng(0), (50, 40), num_picks)
+    assert masks.shape == (50, 40)
+    assert (popcount(masks) == num_picks).all()
+    assert (masks < np.uint64(1) << np.uint64(49)).all()
+
+def test_null_distribution_shape(history):
+    lookbacks = np.array([1, 5, 20])
+    null = simulate_null_distribution(history, n_strategies=3, n_replicates=4, lookback=lookbacks)
+    assert null['win_rate'].shape == null['net_profit'].shape == (4, 3)
+    assert null['max_win_rate'].shape == null['max_net_profit'].shape == (4,)
+    assert null['n_draws'].tolist() == (len(history) - lookbacks).tolist()
+    assert (null['max_net_profit'] == null['net_profit'].max(axis=1)).all()
+    repeated = simulate_null_distribution(history, n_strategies=3, n_replicates=4, lookback=lookbacks)
+    assert (repeated['net_profit'] == null['net_profit']).all()
+
+def test_null_win_rate_matches_exact_odds(history):
+    null = simulate_null_distribution(history, n_strategies=500, n_replicates=4, seed=1)
+    _, win_rate = random_entry_baseline()
+    assert abs(null['win_rate'].mean() - win_rate) < 0.2
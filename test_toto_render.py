@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+import toto_render
+from toto_render import input_digest, is_current, render_figures, DIGEST_SUFFIX
+
+def test_digest_follows_inputs():
+    frame = pd.DataFrame({'Lookback': [1, 2], 'Net_Profit': [-3, 5]})
+    digest = input_digest(frame, {'years': np.arange(3)}, 'title')
+    assert digest == input_digest(frame.copy(), {'years': np.arange(3)}, 'title')
+    assert digest != input_digest(frame.assign(Net_Profit=[-3, 6]), {'years': np.arange(3)}, 'title')
+    assert digest != input_digest(frame, {'years': np.arange(3, dtype=np.int32)}, 'title')
+    assert digest != input_digest(frame, {'years': np.arange(3)}, 'other title')
+
+def test_current_only_with_matching_digest(tmp_path):
+    filename = str(tmp_path / 'figure.png')
+    assert not is_current(filename, 'abc')
+    (tmp_path / 'figure.png').write_bytes(b'png')
+    assert not is_current(filename, 'abc')
+    (tmp_path / ('figure.png' + DIGEST_SUFFIX)).write_text('abc\n')
+    assert is_current(filename, 'abc')
+    assert not is_current(filename, 'abd')
+
+def draw(filename, calls):
+    calls.append(filename)
+    with open(filename, 'w') as f:
+        f.write('figure')
+
+def test_unchanged_figures_are_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(toto_render, 'pyplot', lambda: None)
+    calls = []
+    first, second = str(tmp_path / 'first.png'), str(tmp_path / 'second.png')
+    jobs = [(draw, (first, calls), first, input_digest(1)), (draw, (second, calls), second, input_digest(2))]
+    assert render_figures(jobs, workers=1) == ([first, second], [])
+    assert render_figures(jobs, workers=1) == ([], [first, second])
+    assert calls == [first, second]
+    
+    # A changed input, a deleted figure and force each redraw
+    jobs[0] = (draw, (first, calls), first, input_digest(3))
+    assert render_figures(jobs, workers=1) == ([first], [second])
+    (tmp_path / 'second.png').unlink()
+    assert render_figures(jobs, workers=1) == ([second], [first])
+    assert render_figures(jobs, workers=1, force=True) == ([first, second], [])
+    assert calls == [first, second, first, second, first, second]
@@ -0,0 +1,59 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import urlopen
+import pytest
+from conftest import write_toto_csv
+from toto_analyzer import calculate_weighted_frequencies, get_suggested_numbers
+from toto_backtest import run_backtest
+from toto_service import SuggestionService, ServiceHandler
+
+@pytest.fixture
+def service(history, tmp_path):
+    file_path = str(tmp_path / 'ToTo.csv')
+    write_toto_csv(file_path, history)
+    return SuggestionService(file_path)
+
+@pytest.fixture
+def server(service):
+    ServiceHandler.service = service
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ServiceHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+def get(url):
+    with urlopen(url) as response:
+        return json.load(response)
+
+@pytest.mark.parametrize('picks', [6, 8])
+@pytest.mark.parametrize('lookback', [1, 10])
+def test_backtest_endpoint_matches_run_backtest(history, server, lookback, picks):
+    for weight in (0.1, 0.6):
+        answer = get(f'{server}/backtest?lookback={lookback}&weight={weight}&picks={picks}'
+                     '&start_draw=180&end_draw=40')
+        results, total_cost, total_prize, wins = run_backtest(history, lookback, 180, 40, weight,
+                                                              num_picks=picks)
+        assert answer['total_draws'] == len(results)
+        assert answer['total_cost'] == total_cost
+        assert answer['total_prize'] == total_prize
+        assert answer['wins'] == wins
+
+def test_suggest_endpoint_matches_weighted_frequencies(history, server):
+    for draw in (200, 57, 2):
+        answer = get(f'{server}/suggest?draw={draw}&lookback=7&weight=0.3')
+        frequencies = calculate_weighted_frequencies(history, draw, 7, 0.3)
+        assert answer['numbers'] == get_suggested_numbers(frequencies)
+    # The upcoming draw is suggested from the latest draws
+    assert len(get(f'{server}/suggest?draw=201&lookback=7')['numbers']) == 6
+
+@pytest.mark.parametrize('query', ['suggest?draw=999&lookback=7', 'suggest?draw=50&lookback=7&weight=nan',
+                                   'backtest?lookback=7&weight=inf', 'backtest?lookback=7&weight=-Infinity'])
+def test_bad_query_is_rejected(server, query):
+    with pytest.raises(HTTPError) as error:
+        urlopen(f'{server}/{query}')
+    assert error.value.code == 400
+    assert get(f'{server}/status')['draws'] == 200
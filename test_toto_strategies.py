@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import toto_strategies
+from toto_backtest import evaluate_lookback, rolling_suggestions, DEFAULT_STRATEGY
+from toto_strategies import STRATEGIES, get_strategy, evaluate_strategy
+
+WEIGHTS = [0.1, 0.5, 1.0]
+
+@pytest.mark.parametrize('rows', [(0, 10), (40, 75), (140, 150)])
+@pytest.mark.parametrize('strategy', list(STRATEGIES))
+def test_row_range_matches_whole_history(history, monkeypatch, strategy, rows):
+    # A short first span makes the gap search widen several times
+    monkeypatch.setattr(toto_strategies, 'GAP_SPAN', 2)
+    kernel = get_strategy(strategy)
+    start, stop = rows
+    whole = kernel(history, 5, WEIGHTS, 7)
+    assert (kernel(history, 5, WEIGHTS, 7, start, stop) == whole[:, start:stop]).all()
+
+@pytest.mark.parametrize('strategy', list(STRATEGIES))
+def test_evaluate_new_draws(history, strategy):
+    positions, prizes = evaluate_strategy(history, strategy, 5, WEIGHTS)
+    new_positions, new_prizes = evaluate_strategy(history, strategy, 5, WEIGHTS, np.arange(3))
+    assert (new_positions == positions[:3]).all()
+    assert (new_prizes == prizes[:, :3]).all()
+
+@pytest.mark.parametrize('num_picks', [6, 9])
+@pytest.mark.parametrize('lookback', [1, 5])
+def test_weighted_kernel_matches_native_path(history, lookback, num_picks):
+    kernel = get_strategy(DEFAULT_STRATEGY)
+    native_positions, native_prizes = evaluate_lookback(history, lookback, WEIGHTS, num_picks=num_picks)
+    positions, prizes = evaluate_strategy(history, DEFAULT_STRATEGY, lookback, WEIGHTS, num_picks=num_picks)
+    assert (positions == native_positions).all()
+    assert (prizes == native_prizes).all()
+    for idx, least_weight in enumerate(WEIGHTS):
+        assert (kernel(history, lookback, WEIGHTS, num_picks)[idx]
+                == rolling_suggestions(history, lookback, least_weight, num_picks=num_picks)).all()
+
+@pytest.mark.parametrize('strategy', list(STRATEGIES))
+def test_blocks_match_one_kernel_call(history, monkeypatch, strategy):
+    positions = np.array([150, 3, 60, 61, 62, 190, 4, 120])
+    whole = get_strategy(strategy)(history, 5, WEIGHTS, 7)[:, positions]
+    _, prizes = evaluate_strategy(history, strategy, 5, WEIGHTS, positions, 7)
+    monkeypatch.setattr(toto_strategies, 'KERNEL_BLOCK_ROWS', 7)
+    assert (toto_strategies._kernel_tickets(history, strategy, 5, WEIGHTS, positions, 7) == whole).all()
+    assert (evaluate_strategy(history, strategy, 5, WEIGHTS, positions, 7)[1] == prizes).all()
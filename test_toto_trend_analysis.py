@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from toto_analyzer import (calculate_weighted_frequencies, get_suggested_numbers, get_draw_numbers, check_winning,
+                           entry_cost)
+from toto_backtest import backtest_positions
+from toto_trend_analysis import analyze_yearly_trends
+
+@pytest.mark.parametrize('num_picks', [6, 8])
+def test_yearly_trends_match_per_draw_loop(history, num_picks):
+    lookbacks, weights = [1, 3, 6], [0.5, 1.0]
+    results = analyze_yearly_trends(history, lookbacks, weights, num_picks=num_picks)
+    years = results['years'].tolist()
+    assert len(years) > 1
+    for config, (lookback, weight) in enumerate(zip(results['lookback'], results['weight'])):
+        assert (lookback, weight) == (lookbacks[config // 2], weights[config % 2])
+        # Equal weights (1.0) and short windows tie most numbers, which the first-seen order breaks
+        wins = np.zeros(len(years), dtype=np.int64)
+        played = np.zeros(len(years), dtype=np.int64)
+        prizes = np.zeros(len(years), dtype=np.int64)
+        for position in backtest_positions(history, lookback):
+            draw = int(history.draws[position])
+            frequencies = calculate_weighted_frequencies(history, draw, lookback, weight)
+            picked = get_suggested_numbers(frequencies, num_picks)
+            winning, additional = get_draw_numbers(history, position)
+            year = years.index(history.dates[position].astype('datetime64[Y]').astype(int) + 1970)
+            prize = check_winning(picked, winning, additional, history.payouts[position])
+            played[year] += 1
+            wins[year] += prize > 0
+            prizes[year] += prize
+        assert results['total_count'][config].tolist() == played.tolist()
+        assert results['win_count'][config].tolist() == wins.tolist()
+        assert results['profit'][config].tolist() == (prizes - played * entry_cost(num_picks)).tolist()
@@ -1,96 +1,701 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import tempfile
 import numpy as np
-from collections import defaultdict
+from toto_profile import profiled, enable_profiling, write_profile, add_profile_argument
 
-def read_toto_data(file_path):
-    """Read TOTO data from CSV file."""
-    return pd.read_csv(file_path)
+WINNING_COLUMNS = ['Winning Number 1', '2', '3', '4', '5', '6']
+ADDITIONAL_COLUMN = 'Additional Number'
+NUMBER_COLUMNS = WINNING_COLUMNS + [ADDITIONAL_COLUMN]
+DATE_FORMAT = '%d/%m/%Y'
+# Columns read from the CSV and their types; prize and statistics columns are
+# skipped. Numbers are read as float32 so missing ones (NaN) can be checked
+# before they become uint8, with 0 for missing.
+CSV_DTYPES = {'Draw': np.int32, 'Date': str, **{col: np.float32 for col in NUMBER_COLUMNS}}
+# Validation errors listed before the rest are only counted
+MAX_REPORTED_PROBLEMS = 10
+# Prize columns of the CSV, e.g. 'Group 1 Prize' or 'Division 1 Prize'
+PRIZE_COLUMN = re.compile(r'^\s*(?:Group|Division)\s*([1-7])\s*Prize\s*$', re.IGNORECASE)
+
+# Weighted frequencies are rounded to this many decimals before ranking, so
+# frequencies that are equal up to floating-point noise tie and are ordered
+# by first appearance
+FREQUENCY_DECIMALS = 9
+
+# Rows of running sums held at once by rolling_window_counts
+WINDOW_CHUNK_ROWS = 16384
+
+# Binary cache of the parsed CSV, stored in a directory next to it
+CACHE_SUFFIX = '.cache'
+CACHE_VERSION = 3
+CACHE_ARRAYS = ['draws', 'dates', 'winning', 'additional', 'numbers', 'payouts']
+
+# Prize structure
+# Fixed prize of each group (Group 1 to Group 7), plus a trailing 0 for no prize
+GROUP_PRIZES = np.array([1000000, 100000, 2000, 400, 50, 25, 10, 0], dtype=np.int64)
+NO_PRIZE = 7
+
+# Prize group indexed by (matches, has_additional); NO_PRIZE below 3 matches
+PRIZE_GROUPS = np.full((7, 2), NO_PRIZE, dtype=np.intp)
+PRIZE_GROUPS[6] = [0, 0]    # Group 1 - 6 numbers
+PRIZE_GROUPS[5] = [2, 1]    # Group 3 - 5 numbers, Group 2 - 5 numbers + additional
+PRIZE_GROUPS[4] = [4, 3]    # Group 5 - 4 numbers, Group 4 - 4 numbers + additional
+PRIZE_GROUPS[3] = [6, 5]    # Group 7 - 3 numbers, Group 6 - 3 numbers + additional
+
+# Prize indexed by (matches, has_additional)
+PRIZE_TABLE = GROUP_PRIZES[PRIZE_GROUPS]
+
+# Entries pick 6 numbers (Ordinary) or 7-12 numbers (System 7 to System 12).
+# A System entry plays every 6-number combination of its picks at $1 each.
+MIN_PICKS = 6
+MAX_PICKS = 12
+
+def system_group_counts(num_picks):
+    """Sub-tickets of an entry falling into each prize group.
+
+    Returns an array indexed by (matches, has_additional, group): for an entry
+    of num_picks numbers with that many winning numbers and the additional
+    number among them, how many of its 6-number combinations win each prize
+    group (NO_PRIZE counts the losing ones).
+    """
+    counts = np.zeros((7, 2, NO_PRIZE + 1), dtype=np.int64)
+    for matches in range(7):
+        for has_additional in range(2):
+            others = num_picks - matches - has_additional
+            if others < 0:
+                continue
+            for sub_matches in range(matches + 1):
+                for sub_additional in range(has_additional + 1):
+                    sub_others = 6 - sub_matches - sub_additional
+                    if sub_others < 0:
+                        continue
+                    group = PRIZE_GROUPS[sub_matches, sub_additional]
+                    counts[matches, has_additional, group] += (math.comb(matches, sub_matches)
+                                                               * math.comb(others, sub_others))
+    return counts
+
+# Sub-tickets per prize group and total prize of an entry, indexed by
+# (matches, has_additional), per entry size
+SYSTEM_GROUP_COUNTS = {num_picks: system_group_counts(num_picks)
+                       for num_picks in range(MIN_PICKS, MAX_PICKS + 1)}
+SYSTEM_PRIZE_TABLES = {num_picks: counts @ GROUP_PRIZES for num_picks, counts in SYSTEM_GROUP_COUNTS.items()}
+SYSTEM_PRIZE_TABLES[MIN_PICKS] = PRIZE_TABLE
+
+def prize_table(num_picks=6):
+    """Prize table indexed by (matches, has_additional) for an entry of num_picks numbers."""
+    if num_picks not in SYSTEM_PRIZE_TABLES:
+        raise ValueError(f"Entries must pick {MIN_PICKS}-{MAX_PICKS} numbers, got {num_picks}")
+    return SYSTEM_PRIZE_TABLES[num_picks]
+
+def entry_cost(num_picks=6):
+    """Cost of an entry: $1 per 6-number combination it covers."""
+    prize_table(num_picks)
+    return math.comb(num_picks, 6)
+
+NUMBER_BITS = np.arange(49, dtype=np.uint64)
+
+@profiled
+def read_toto_data(file_path, use_cache=True):
+    """Read TOTO data from CSV file.
+
+    Returns the draw numbers, dates (parsed once) and number columns, sorted
+    newest draw first. With use_cache the parsed arrays come from the binary
+    cache kept next to the CSV (see load_toto_arrays).
+    """
+    import pandas as pd
+    arrays = load_toto_arrays(file_path, use_cache)
+    data = pd.DataFrame({'Draw': arrays['draws'], 'Date': arrays['dates']})
+    for idx, col in enumerate(WINNING_COLUMNS):
+        data[col] = arrays['winning'][:, idx]
+    data[ADDITIONAL_COLUMN] = arrays['additional']
+    for group in range(NO_PRIZE):
+        data[f'Group {group + 1} Prize'] = arrays['payouts'][:, group]
+    return data
+
+@profiled
+def load_draw_history(file_path, use_cache=True):
+    """Load TOTO data from CSV file straight into a DrawHistory."""
+    arrays = load_toto_arrays(file_path, use_cache)
+    return DrawHistory(draws=arrays['draws'],
+                       dates=arrays['dates'],
+                       numbers=arrays['numbers'],
+                       additional=arrays['additional'],
+                       payouts=arrays['payouts'])
+
+def load_toto_arrays(file_path, use_cache=True):
+    """Parsed TOTO data as a dict of typed arrays, sorted newest draw first.
+
+    The arrays are saved as .npy files in a sidecar directory keyed by the
+    SHA-256 of the CSV content. While the CSV is unchanged they are
+    memory-mapped from there instead of parsing the CSV again; any change to
+    the CSV rebuilds the cache on the next load. Rebuilt files replace the
+    old ones rather than overwriting them, so processes that still have the
+    old arrays mapped keep reading them intact.
+    """
+    if not use_cache:
+        return parse_toto_csv(file_path)
+
+    with open(file_path, 'rb') as f:
+        content_hash = hashlib.sha256(f.read()).hexdigest()
+
+    cache_dir = file_path + CACHE_SUFFIX
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta == {'version': CACHE_VERSION, 'sha256': content_hash}:
+            return {name: np.load(os.path.join(cache_dir, name + '.npy'), mmap_mode='r')
+                    for name in CACHE_ARRAYS}
+    except (OSError, ValueError):
+        pass
+
+    arrays = parse_toto_csv(file_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Invalidate first and write the metadata last, so an interrupted
+        # rebuild is never mistaken for a valid cache
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for name in CACHE_ARRAYS:
+            replace_file(os.path.join(cache_dir, name + '.npy'), lambda f: np.save(f, arrays[name]))
+        meta = json.dumps({'version': CACHE_VERSION, 'sha256': content_hash}).encode()
+        replace_file(meta_path, lambda f: f.write(meta))
+    except OSError:
+        # The cache is only an accelerator; keep going without it
+        pass
+    return arrays
+
+def replace_file(file_path, write):
+    """Write a file through write(f) on a temporary file in the same directory, then move it into place."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.',
+                                     prefix=os.path.basename(file_path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+@profiled
+def parse_toto_csv(file_path):
+    """Parse the TOTO CSV into the typed arrays stored in the cache.
+
+    Only the draw, date, number and prize columns are read, with the types
+    of CSV_DTYPES, and dates are parsed once. Raises ValueError listing the
+    problems found by validate_draws.
+    """
+    import pandas as pd
+    data = pd.read_csv(file_path, usecols=lambda col: col in CSV_DTYPES or PRIZE_COLUMN.match(col),
+                       dtype=CSV_DTYPES)
+    missing = [col for col in CSV_DTYPES if col not in data]
+    if missing:
+        raise ValueError(f"Missing columns in {file_path}: {', '.join(missing)}")
+    draws = data['Draw'].to_numpy()
+    order = np.argsort(-draws, kind='stable')
+    draws = draws[order]
+    values = data[NUMBER_COLUMNS].to_numpy()[order]
+    validate_draws(draws, values, file_path)
+
+    numbers = np.nan_to_num(values, nan=0).astype(np.uint8)
+    winning, additional = numbers[:, :6], numbers[:, 6]
+    incidence = np.zeros((len(draws), 49), dtype=np.uint8)
+    rows, cols = np.nonzero(winning)
+    incidence[rows, winning[rows, cols].astype(np.intp) - 1] = 1
+    dates = parse_dates(data['Date'])[order]
+    return {
+        'draws': draws,
+        'dates': dates,
+        'winning': winning,
+        'additional': additional,
+        'numbers': incidence,
+        'payouts': parse_payouts(data)[order]
+    }
+
+def parse_payouts(data):
+    """Prize of every group in every draw, as an (n_draws, 7) array.
+
+    Amounts come from the prize columns of data (see PRIZE_COLUMN), with '$'
+    and thousands separators removed. Groups without a column, and blank,
+    non-numeric or zero amounts, get the fixed GROUP_PRIZES amount.
+    """
+    import pandas as pd
+    payouts = np.tile(GROUP_PRIZES[:NO_PRIZE], (len(data), 1))
+    for col in data.columns:
+        match = PRIZE_COLUMN.match(str(col))
+        if not match:
+            continue
+        values = data[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = values.astype(str).str.replace(r'[$,\s]', '', regex=True)
+        amounts = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+        paid = amounts > 0
+        payouts[paid, int(match.group(1)) - 1] = np.round(amounts[paid]).astype(np.int64)
+    return payouts
+
+def parse_dates(values):
+    """Parse DATE_FORMAT strings into datetime64[D].
+
+    Zero-padded dd/mm/yyyy dates are converted arithmetically, which is much
+    faster than strptime; anything else falls back to pd.to_datetime, which
+    also reports invalid dates.
+    """
+    text = np.asarray(values, dtype=str)
+    # Strings longer than a date must not be truncated to one
+    fits = text.dtype.itemsize <= np.dtype('U10').itemsize
+    text = text.astype('U10') if fits else text[:0].astype('U10')
+    codes = text.view(np.uint32).reshape(len(text), 10).astype(np.int64) - ord('0')
+    digits = codes[:, [0, 1, 3, 4, 6, 7, 8, 9]]
+    if fits and (codes[:, [2, 5]] == ord('/') - ord('0')).all() and ((digits >= 0) & (digits <= 9)).all():
+        day = codes[:, 0] * 10 + codes[:, 1]
+        month = codes[:, 3] * 10 + codes[:, 4]
+        year = codes[:, 6] * 1000 + codes[:, 7] * 100 + codes[:, 8] * 10 + codes[:, 9]
+        months = (year - 1970) * 12 + month - 1
+        dates = months.astype('datetime64[M]').astype('datetime64[D]') + (day - 1)
+        # Days past the end of their month roll over into the next one
+        valid = (month >= 1) & (month <= 12) & (day >= 1) & (dates.astype('datetime64[M]').astype(np.int64) == months)
+        if valid.all():
+            return dates
+
+    import pandas as pd
+    return pd.to_datetime(pd.Series(values), format=DATE_FORMAT).to_numpy().astype('datetime64[D]')
+
+def validate_draws(draws, values, source='data'):
+    """Reject out-of-range numbers, numbers repeated within a draw and duplicate draws.
+
+    values holds the 6 winning numbers and the additional number of each
+    draw, with NaN or 0 for a missing number. Raises ValueError listing the
+    problems found, each with its draw number.
+    """
+    problems = []
+    present = ~np.isnan(values) & (values != 0)
+    invalid = present & ((values < 1) | (values > 49) | (values != np.round(values)))
+    for row, col in zip(*np.nonzero(invalid)):
+        name = f'Winning Number {col + 1}' if col < 6 else ADDITIONAL_COLUMN
+        problems.append(f"draw {draws[row]}: {name} is {values[row, col]:g}, not a number from 1-49")
+
+    # Equal neighbours after sorting each draw are repeated numbers
+    ordered = np.sort(np.where(present & ~invalid, values, np.nan), axis=1)
+    repeated = ordered[:, 1:] == ordered[:, :-1]
+    for row in np.flatnonzero(repeated.any(axis=1)):
+        numbers = np.unique(ordered[row, 1:][repeated[row]]).astype(int).tolist()
+        problems.append(f"draw {draws[row]}: {', '.join(map(str, numbers))} drawn more than once")
+
+    unique_draws, counts = np.unique(draws, return_counts=True)
+    for draw, count in zip(unique_draws[counts > 1], counts[counts > 1]):
+        problems.append(f"draw {draw}: appears {count} times")
+
+    if problems:
+        listed = problems[:MAX_REPORTED_PROBLEMS]
+        if len(problems) > len(listed):
+            listed.append(f"... and {len(problems) - len(listed)} more")
+        raise ValueError(f"{len(problems)} invalid draw(s) in {source}:\n  " + "\n  ".join(listed))
+
+class DrawHistory:
+    """Draw history held as arrays, newest draw first, with O(1) draw lookup.
+
+    Row i of ``numbers`` is a uint8 incidence vector over 1-49 for the winning
+    numbers of the i-th draw and ``additional`` holds that draw's additional
+    number (0 when missing). Row i of ``payouts`` holds the prize of Group 1
+    to Group 7 in that draw (the fixed GROUP_PRIZES when not given). Rows are
+    sorted by draw number whatever their order in the source; duplicate draw
+    numbers are rejected. Draw numbers missing from the sequence are listed in
+    ``missing_draws``, and lookback windows cover the draws that are present,
+    skipping over the gaps.
+    """
+
+    def __init__(self, draws, dates, numbers, additional, payouts=None):
+        draws = np.asarray(draws)
+        if payouts is None:
+            payouts = np.broadcast_to(GROUP_PRIZES[:NO_PRIZE], (len(draws), NO_PRIZE))
+        order = np.argsort(-draws, kind='stable')
+        if np.any(order != np.arange(len(draws))):
+            draws, numbers, additional = draws[order], numbers[order], additional[order]
+            payouts = payouts[order]
+            if dates is not None:
+                dates = dates[order]
+
+        duplicated = np.unique(draws[1:][draws[1:] == draws[:-1]])
+        if len(duplicated):
+            raise ValueError(f"Duplicate draw numbers in data: {duplicated.tolist()}")
+
+        self.draws = draws
+        self.dates = dates
+        self.numbers = numbers
+        self.additional = additional
+        self.payouts = payouts
+
+        # Dense draw number -> row position index, -1 for missing draws
+        self.first_draw = int(draws[-1]) if len(draws) else 0
+        span = int(draws[0]) - self.first_draw + 1 if len(draws) else 0
+        self._positions = np.full(span, -1, dtype=np.intp)
+        self._positions[draws - self.first_draw] = np.arange(len(draws))
+        self.missing_draws = np.flatnonzero(self._positions < 0) + self.first_draw
+
+    @classmethod
+    def from_frame(cls, data):
+        """Build a DrawHistory from the DataFrame returned by read_toto_data."""
+        import pandas as pd
+        # Missing numbers may be NaN or 0
+        winning = np.nan_to_num(data[WINNING_COLUMNS].to_numpy(dtype=float), nan=0)
+        rows, cols = np.nonzero(winning > 0)
+        numbers = np.zeros((len(data), 49), dtype=np.uint8)
+        numbers[rows, winning[rows, cols].astype(int) - 1] = 1
+
+        additional = data[ADDITIONAL_COLUMN].to_numpy(dtype=float)
+        additional = np.nan_to_num(additional, nan=0).astype(np.uint8)
+
+        dates = data['Date']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, format=DATE_FORMAT)
+
+        return cls(draws=data['Draw'].to_numpy(),
+                   dates=dates.to_numpy().astype('datetime64[D]'),
+                   numbers=numbers,
+                   additional=additional,
+                   payouts=parse_payouts(data))
+
+    def __len__(self):
+        return len(self.draws)
+
+    def __contains__(self, draw):
+        # Only whole draw numbers are present; int() would truncate 10.5 to 10
+        try:
+            if int(draw) != draw:
+                return False
+        except (TypeError, ValueError, OverflowError):
+            return False
+        offset = int(draw) - self.first_draw
+        return 0 <= offset < len(self._positions) and self._positions[offset] >= 0
+
+    def position(self, draw):
+        """Row position of a draw number."""
+        if draw not in self:
+            raise KeyError(f"Draw {draw} not found in data")
+        return int(self._positions[int(draw) - self.first_draw])
+
+    def earlier_draws(self, position):
+        """Number of draws in the history older than the draw at position."""
+        return len(self.draws) - 1 - position
+
+    def window(self, position, lookback_draws):
+        """Row bounds of the lookback window before the draw at position.
+
+        The window holds up to lookback_draws older draws, most recent first;
+        history.numbers[start:stop] is a view, not a copy.
+        """
+        start = position + 1
+        return start, min(start + lookback_draws, len(self.draws))
+
+def as_draw_history(data):
+    """Return data as a DrawHistory, building one from a DataFrame if needed."""
+    if isinstance(data, DrawHistory):
+        return data
+    return DrawHistory.from_frame(data)
+
+def drawn_incidence(history, start=0, stop=None):
+    """Incidence of all drawn numbers (winning + additional) for rows start:stop."""
+    numbers = history.numbers[start:stop]
+    additional = history.additional[start:stop]
+    drawn = numbers.copy()
+    rows = np.flatnonzero(additional)
+    drawn[rows, additional[rows].astype(int) - 1] = 1
+    return drawn
+
+def get_draw_numbers(history, idx):
+    """Return the sorted winning numbers and the additional number of row idx."""
+    winning_numbers = (np.flatnonzero(history.numbers[idx]) + 1).tolist()
+    return winning_numbers, int(history.additional[idx])
 
 def get_all_numbers_from_row(row):
-    """Extract all winning numbers and additional number from a row."""
-    numbers = []
-    # Get winning numbers
-    winning_numbers = []
-    for col in ['Winning Number 1', '2', '3', '4', '5', '6']:
-        if pd.notna(row[col]):  # Check if the value is not NaN
-            winning_numbers.append(int(row[col]))
-    numbers = sorted(winning_numbers)  # Sort winning numbers
-    
+    """Extract all winning numbers and additional number from a row.
+
+    Missing numbers (0 or NaN) are left out.
+    """
+    winning = np.nan_to_num(np.asarray([row[col] for col in WINNING_COLUMNS], dtype=float), nan=0)
+    winning_numbers = sorted(int(n) for n in winning if n > 0)
+    numbers = list(winning_numbers)
+
     # Add additional number
-    if pd.notna(row['Additional Number']):
-        numbers.append(int(row['Additional Number']))
+    additional = np.nan_to_num(float(row[ADDITIONAL_COLUMN]), nan=0)
+    if additional > 0:
+        numbers.append(int(additional))
     return numbers, winning_numbers
 
+def window_counts(drawn):
+    """Plain and index-weighted occurrence counts of each number in a window.
+
+    Row j of drawn is the j-th most recent draw of the window. Returns the
+    number of draws each number appears in and the sum of j over those draws.
+    """
+    drawn = drawn.astype(np.int64)
+    plain = drawn.sum(axis=0)
+    indexed = np.arange(len(drawn)) @ drawn
+    return plain, indexed
+
+@profiled
+def linear_weighted_frequencies(plain, indexed, window_size, least_weight):
+    """Combine window counts into linearly decayed weighted frequencies.
+
+    Draw j of the window gets weight 1 + j * step, the same weights as
+    np.linspace(1.0, least_weight, window_size), so the weighted frequency of a
+    number is plain + step * indexed.
+    """
+    window_size = np.asarray(window_size)
+    step = (least_weight - 1.0) / np.maximum(window_size - 1, 1)
+    step = np.where(window_size > 1, step, 0.0)
+    return plain + step * indexed
+
+@profiled
+def rolling_window_counts(drawn, lookback_draws):
+    """Window counts for the lookback window of every row in one sliding pass.
+
+    Rows are ordered newest first, so the window of row i is rows
+    i+1 .. i+lookback_draws (truncated at the oldest row). Both counts are
+    differences of running sums, which makes the cost independent of the
+    lookback length. The running sums are taken over blocks of
+    WINDOW_CHUNK_ROWS rows plus their windows, so their memory does not grow
+    with the history, and the counts are int32 whenever they fit. Returns
+    (plain, indexed, window_size).
+    """
+    n = len(drawn)
+    window_size = np.clip(n - 1 - np.arange(n), 0, lookback_draws)
+    # indexed is at most 0 + 1 + ... + (lookback_draws - 1)
+    dtype = np.int32 if lookback_draws * (lookback_draws - 1) // 2 <= np.iinfo(np.int32).max else np.int64
+    plain = np.empty((n, 49), dtype=dtype)
+    indexed = np.empty((n, 49), dtype=dtype)
+
+    for begin in range(0, n, WINDOW_CHUNK_ROWS):
+        end = min(begin + WINDOW_CHUNK_ROWS, n)
+        block = drawn[begin:min(end + lookback_draws, n)].astype(np.int64)
+        block_rows = np.arange(len(block))
+        running = np.zeros((len(block) + 1, 49), dtype=np.int64)
+        np.cumsum(block, axis=0, out=running[1:])
+        running_indexed = np.zeros((len(block) + 1, 49), dtype=np.int64)
+        np.cumsum(block_rows[:, None] * block, axis=0, out=running_indexed[1:])
+
+        rows = block_rows[:end - begin]
+        start = np.minimum(rows + 1, len(block))
+        stop = np.minimum(rows + lookback_draws + 1, len(block))
+        plain[begin:end] = running[stop] - running[start]
+        indexed[begin:end] = running_indexed[stop] - running_indexed[start] - start[:, None] * plain[begin:end]
+    return plain, indexed, window_size
+
+@profiled
+def rolling_first_seen_order(drawn, additional, window_size):
+    """first_seen_order for the lookback window of every row at once.
+
+    The row of each number's next occurrence is carried from the oldest row
+    towards the newest over blocks of WINDOW_CHUNK_ROWS rows, so only the
+    keys are held for the whole history.
+    """
+    n = len(drawn)
+    numbers = np.arange(1, 50)
+    order = np.empty((n, 49), dtype=np.intp)
+    padded_additional = np.append(additional, 0)
+
+    # Row of the next occurrence of each number at or after the current block's end
+    next_after = np.full(49, n, dtype=np.intp)
+    for end in range(n, 0, -WINDOW_CHUNK_ROWS):
+        begin = max(end - WINDOW_CHUNK_ROWS, 0)
+        rows = np.arange(begin, end)
+        next_row = np.empty((end - begin + 1, 49), dtype=np.intp)
+        next_row[:-1] = np.where(drawn[begin:end].astype(bool), rows[:, None], n)
+        next_row[-1] = next_after
+        np.minimum.accumulate(next_row[::-1], axis=0, out=next_row[::-1])
+        next_after = next_row[0].copy()
+
+        # The window of each row starts at the row after it
+        first_seen = next_row[1:]
+        first_row = first_seen - (rows + 1)[:, None]
+        sizes = window_size[begin:end, None]
+        present = first_row < sizes
+        first_row = np.where(present, first_row, sizes)
+        is_additional = present & (padded_additional[first_seen] == numbers)
+        order[begin:end] = first_row * 100 + is_additional * 50 + numbers
+    return order
+
+def first_seen_order(drawn, additional):
+    """Rank key giving the order in which numbers first appear in a window.
+
+    Draws are scanned from most recent, winning numbers in ascending order
+    followed by the additional number. Numbers absent from the window get a
+    key larger than any present number.
+    """
+    present = drawn.any(axis=0)
+    first_row = np.where(present, drawn.argmax(axis=0), len(drawn))
+    numbers = np.arange(1, 50)
+    is_additional = np.zeros(49, dtype=bool)
+    rows = first_row[present]
+    is_additional[present] = additional[rows] == numbers[present]
+    return first_row * 100 + is_additional * 50 + numbers
+
+@profiled
 def calculate_weighted_frequencies(data, target_draw, lookback_draws, least_weight=0.1):
     """Calculate weighted frequency of numbers in the specified lookback period."""
-    # Find the index of the target draw
-    target_idx = data[data['Draw'] == target_draw].index[0]
+    history = as_draw_history(data)
+
+    # Find the position of the target draw
+    target_idx = history.position(target_draw)
+
+    # Get the lookback window before the target draw
+    start, stop = history.window(target_idx, lookback_draws)
+    drawn = drawn_incidence(history, start, stop)
+    if len(drawn) == 0:
+        return {}
 
-    # Get the lookback data before the target draw
-    lookback_data = data.iloc[target_idx + 1:target_idx + lookback_draws + 1]
-    
-    # Initialize dictionary for weighted frequencies
-    weighted_frequencies = defaultdict(float)
-    
     # Calculate weights (linear decay)
-    # Most recent draw gets weight 1.0, oldest draw gets weight 0.1
-    weights = np.linspace(1.0, least_weight, len(lookback_data))
+    # Most recent draw gets weight 1.0, oldest draw gets weight least_weight
+    plain, indexed = window_counts(drawn)
+    frequencies = linear_weighted_frequencies(plain, indexed, len(drawn), least_weight)
 
-    # Process each draw with its corresponding weight
-    for idx, (_, row) in enumerate(lookback_data.iterrows()):
-        numbers, _ = get_all_numbers_from_row(row)
-        weight = weights[idx]
-        
-        # Update weighted frequencies
-        for number in numbers:
-            weighted_frequencies[number] += weight
-    
-    return weighted_frequencies
+    # Report numbers in the order they first appear in the window
+    order = first_seen_order(drawn, history.additional[start:stop])
+    present = np.flatnonzero(plain)
+    present = present[np.argsort(order[present])]
+    return {int(idx) + 1: float(frequencies[idx]) for idx in present}
 
+@profiled
 def get_suggested_numbers(weighted_frequencies, num_picks=6):
-    """Get suggested numbers based on weighted frequencies."""
-    # Sort numbers by frequency
+    """Get suggested numbers based on weighted frequencies.
+
+    When fewer than num_picks numbers have a frequency, the entry is filled
+    with the missing numbers in ascending order, as suggest_tickets does.
+    """
+    # Sort numbers by rounded frequency; ties keep their first-seen order
     sorted_numbers = sorted(weighted_frequencies.items(), 
-                          key=lambda x: x[1], reverse=True)
+                          key=lambda x: np.round(x[1], FREQUENCY_DECIMALS), reverse=True)
+    picked = [num for num, _ in sorted_numbers[:num_picks]]
+    
+    # Numbers absent from the window come after all present ones
+    absent = [num for num in range(1, 50) if num not in weighted_frequencies]
+    picked += absent[:num_picks - len(picked)]
     
     # Return top num_picks numbers
-    return sorted([num for num, _ in sorted_numbers[:num_picks]])
+    return sorted(picked)
+
+@profiled
+def suggest_tickets(frequencies, order, num_picks=6):
+    """Vectorized get_suggested_numbers over the last axis of frequency arrays.
 
-def check_winning(picked_numbers, winning_numbers, additional_number):
-    """Check winning status and return prize."""
-    picked_set = set(picked_numbers)
-    winning_set = set(winning_numbers)
+    Numbers are ranked by weighted frequency rounded to FREQUENCY_DECIMALS,
+    ties broken by order (see first_seen_order), and the top num_picks are
+    returned in ascending order.
+    """
+    frequencies = np.round(frequencies, FREQUENCY_DECIMALS)
+    # Everything above the num_picks-th largest frequency is picked; ties at
+    # that frequency are filled in order. Two partitions avoid a full sort.
+    kth = np.partition(frequencies, 49 - num_picks, axis=-1)[..., 49 - num_picks, None]
+    key = np.where(frequencies == kth, order, np.iinfo(np.int64).max)
+    key = np.where(frequencies > kth, -1, key)
+    picked = np.argpartition(key, num_picks - 1, axis=-1)[..., :num_picks]
+    return np.sort(picked + 1, axis=-1).astype(np.uint8)
+
+def ticket_masks(tickets):
+    """Encode tickets (last axis holds the numbers) as 64-bit masks, bit n-1 for number n."""
+    shifts = tickets.astype(np.uint64) - np.uint64(1)
+    return np.bitwise_or.reduce(np.left_shift(np.uint64(1), shifts), axis=-1)
+
+def incidence_masks(numbers):
+    """Encode incidence rows over 1-49 as 64-bit masks."""
+    return np.bitwise_or.reduce(numbers.astype(np.uint64) << NUMBER_BITS, axis=-1)
+
+def additional_masks(additional):
+    """Encode additional numbers as single-bit masks (0 when missing)."""
+    additional = np.asarray(additional).astype(np.uint64)
+    return np.where(additional > 0, np.left_shift(np.uint64(1), additional - np.uint64(1)), np.uint64(0))
+
+def popcount(masks):
+    """Number of set bits in each element of a uint64 array."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks)
+    # Parallel bit count for NumPy versions without bitwise_count
+    masks = masks - ((masks >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    masks = (masks & np.uint64(0x3333333333333333)) + ((masks >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    masks = (masks + (masks >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (masks * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+def score_masks(tickets, winning, additional, num_picks=6, payouts=None):
+    """Prize of every ticket mask against the winning and additional masks of its draw.
+
+    All three arguments broadcast against each other, so whole arrays of
+    tickets are scored against whole arrays of draws in one call. System
+    entries (num_picks 7-12) are priced from the closed-form sub-ticket
+    counts of system_group_counts rather than by expanding them. payouts,
+    if given, holds the 7 group prizes of each draw (see
+    DrawHistory.payouts) and broadcasts like winning with a trailing group
+    axis; otherwise the fixed GROUP_PRIZES are paid.
+    """
+    matches = popcount(tickets & winning).astype(np.intp)
+    has_additional = (tickets & additional) != 0
+    if payouts is None:
+        return prize_table(num_picks)[matches, has_additional.astype(np.intp)]
     
-    matches = len(picked_set.intersection(winning_set))
-    has_additional = additional_number in picked_set
+    prize_table(num_picks)
+    payouts = np.asarray(payouts, dtype=np.int64)
+    group_prizes = np.concatenate([payouts, np.zeros(payouts.shape[:-1] + (1,), dtype=np.int64)], axis=-1)
+    if num_picks == MIN_PICKS:
+        # One gather of each ticket's prize group from its draw's prizes
+        groups = PRIZE_GROUPS[matches, has_additional.astype(np.intp)]
+        group_prizes = np.broadcast_to(group_prizes, groups.shape + (NO_PRIZE + 1,))
+        return np.take_along_axis(group_prizes, groups[..., None], axis=-1)[..., 0]
+    counts = SYSTEM_GROUP_COUNTS[num_picks][matches, has_additional.astype(np.intp)]
+    return (counts * group_prizes).sum(axis=-1)
+
+@profiled
+def score_tickets(tickets, numbers, additional, payouts=None):
+    """Vectorized check_winning for tickets against incidence rows of their draws."""
+    return score_masks(ticket_masks(tickets), incidence_masks(numbers), additional_masks(additional),
+                       num_picks=tickets.shape[-1], payouts=payouts)
+
+@profiled
+def check_winning(picked_numbers, winning_numbers, additional_number, payouts=None):
+    """Check winning status and return prize.
+
+    Picking 7-12 numbers scores a System entry, i.e. the total prize of all
+    its 6-number combinations. payouts, if given, holds the 7 group prizes
+    of the draw; otherwise the fixed GROUP_PRIZES are paid.
+    """
+    picked_mask = 0
+    for number in picked_numbers:
+        picked_mask |= 1 << (int(number) - 1)
+    winning_mask = 0
+    for number in winning_numbers:
+        winning_mask |= 1 << (int(number) - 1)
     
-    # Prize structure
-    if matches == 6:
-        return 1000000  # Group 1 - 6 numbers
-    elif matches == 5 and has_additional:
-        return 100000   # Group 2 - 5 numbers + additional
-    elif matches == 5:
-        return 2000     # Group 3 - 5 numbers
-    elif matches == 4 and has_additional:
-        return 400      # Group 4 - 4 numbers + additional
-    elif matches == 4:
-        return 50       # Group 5 - 4 numbers
-    elif matches == 3 and has_additional:
-        return 25       # Group 6 - 3 numbers + additional
-    elif matches == 3:
-        return 10       # Group 7 - 3 numbers
-    return 0
+    matches = bin(picked_mask & winning_mask).count('1')
+    has_additional = additional_number in picked_numbers
+    num_picks = max(MIN_PICKS, bin(picked_mask).count('1'))
+    
+    if payouts is None:
+        return int(prize_table(num_picks)[matches, int(has_additional)])
+    group_prizes = np.append(np.asarray(payouts, dtype=np.int64), 0)
+    return int(SYSTEM_GROUP_COUNTS[num_picks][matches, int(has_additional)] @ group_prizes)
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Suggest TOTO numbers from weighted draw frequencies.")
+    add_profile_argument(parser, 'toto_analyzer')
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    if args.profile:
+        enable_profiling()
     try:
         # Read the data
-        data = read_toto_data('ToTo.csv')
+        history = load_draw_history('ToTo.csv')
         
         # Get user input for target draw
         while True:
             try:
                 target_draw = int(input("Enter the draw number to analyze (e.g., 4048): "))
-                if target_draw in data['Draw'].values:
+                if target_draw in history:
                     break
                 print("Draw number not found in data. Please enter a valid draw number.")
             except ValueError:
@@ -107,18 +712,18 @@ def main():
                 print("Please enter a valid number.")
         
         # Calculate weighted frequencies
-        weighted_frequencies = calculate_weighted_frequencies(data, target_draw, lookback)
+        weighted_frequencies = calculate_weighted_frequencies(history, target_draw, lookback)
         
         # Get suggested numbers
         suggested_numbers = get_suggested_numbers(weighted_frequencies)
         
         # Get actual winning numbers for the target draw
-        target_row = data[data['Draw'] == target_draw].iloc[0]
-        actual_numbers, actual_winning = get_all_numbers_from_row(target_row)
-        actual_additional = actual_numbers[-1]
+        target_idx = history.position(target_draw)
+        actual_winning, actual_additional = get_draw_numbers(history, target_idx)
         
         # Calculate prize
-        prize = check_winning(suggested_numbers, actual_winning, actual_additional)
+        prize = check_winning(suggested_numbers, actual_winning, actual_additional,
+                              history.payouts[target_idx])
         
         # Print results
         print(f"\nAnalysis for Draw #{target_draw}:")
@@ -142,6 +747,9 @@ def main():
         print("Error: ToTo.csv file not found in the current directory.")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+    finally:
+        if args.profile:
+            write_profile(args.profile)
 
 if __name__ == "__main__":
     main() 
@@ -1,64 +1,466 @@
-import pandas as pd
-from toto_analyzer import (read_toto_data, get_all_numbers_from_row,
+import argparse
+import numpy as np
+from toto_profile import profiled, enable_profiling, write_profile, add_profile_argument
+from toto_analyzer import (load_draw_history, as_draw_history, get_draw_numbers,
                          calculate_weighted_frequencies, get_suggested_numbers,
-                         check_winning)
+                         check_winning, drawn_incidence, rolling_window_counts,
+                         rolling_first_seen_order, linear_weighted_frequencies,
+                         suggest_tickets, score_tickets, window_counts,
+                         first_seen_order, entry_cost)
 
-def run_backtest(data, lookback_period, start_draw=None, end_draw=None, least_weight=0.1):
-    """Run backtest over specified period."""
-    results = []
+# Upper bound on frequency-array elements scored in one batch
+MAX_BATCH_ELEMENTS = 4000000
+# Below this many draws evaluate_lookback builds each window directly; the
+# per-draw loop costs far more per element than a vectorized sliding pass
+MAX_DIRECT_POSITIONS = 256
+# The weighted frequency strategy, scored natively here; every other
+# registered strategy is played from its toto_strategies kernel
+DEFAULT_STRATEGY = 'weighted'
+
+class BacktestResults:
+    """Backtest results held as column arrays, one row per played draw.
+
+    draws and dates identify the draws, tickets is an (n, picks) uint8 array
+    of suggested numbers, winning an (n, 6) uint8 array of winning numbers
+    (0-padded), additional the additional numbers and prizes the prize won.
+    cost is the price of one entry (more than $1 for System entries).
+    Indexing and iterating yield one dict per draw, in the format of a
+    results row; a slice gives a BacktestResults of those draws.
+    """
+
+    def __init__(self, draws, dates, tickets, winning, additional, prizes, cost=1):
+        self.draws = draws
+        self.dates = dates
+        self.tickets = tickets
+        self.winning = winning
+        self.additional = additional
+        self.prizes = prizes
+        self.cost = cost
+
+    @classmethod
+    def from_positions(cls, history, positions, tickets, prizes, cost=1):
+        """Collect results for the draws at the given rows of a DrawHistory."""
+        numbers = history.numbers[positions].astype(bool)
+        winning = np.sort(np.where(numbers, np.arange(1, 50), 99), axis=1)[:, :6]
+        dates = history.dates[positions] if history.dates is not None else np.full(len(positions), 'NaT', dtype='datetime64[D]')
+        return cls(draws=history.draws[positions].astype(np.int32),
+                   dates=dates.astype('datetime64[D]'),
+                   tickets=np.asarray(tickets, dtype=np.uint8),
+                   winning=np.where(winning == 99, 0, winning).astype(np.uint8),
+                   additional=history.additional[positions].astype(np.uint8),
+                   prizes=np.asarray(prizes, dtype=np.int64),
+                   cost=cost)
+
+    def __len__(self):
+        return len(self.draws)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return BacktestResults(self.draws[idx], self.dates[idx], self.tickets[idx], self.winning[idx],
+                                   self.additional[idx], self.prizes[idx], self.cost)
+        prize = int(self.prizes[idx])
+        return {
+            'Draw': int(self.draws[idx]),
+            'Date': self.dates[idx],
+            'Suggested_Numbers': self.tickets[idx].tolist(),
+            'Winning_Numbers': [int(n) for n in self.winning[idx] if n],
+            'Additional_Number': int(self.additional[idx]),
+            'Prize': prize,
+            'Profit': prize - self.cost
+        }
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    @property
+    def profits(self):
+        return self.prizes - self.cost
+
+    @property
+    def total_cost(self):
+        return len(self) * self.cost
+
+    @property
+    def total_prize(self):
+        return int(self.prizes.sum())
+
+    @property
+    def wins(self):
+        return int(np.count_nonzero(self.prizes))
+
+@profiled
+def rolling_window_state(history, lookback_period, start=0, stop=None):
+    """Window counts and tie-break order for the lookback window of every draw.
+
+    start and stop limit the result to rows start:stop; only the rows their
+    windows reach are processed.
+    """
+    stop = len(history) if stop is None else stop
+    window_stop = min(stop + lookback_period, len(history))
+    drawn = drawn_incidence(history, start, window_stop)
+    plain, indexed, window_size = rolling_window_counts(drawn, lookback_period)
+    order = rolling_first_seen_order(drawn, history.additional[start:window_stop], window_size)
+    rows = slice(0, stop - start)
+    return plain[rows], indexed[rows], window_size[rows], order[rows]
+
+@profiled
+def window_state_at(history, positions, lookback_period):
+    """rolling_window_state for selected rows only, computed window by window.
+
+    Costs O(len(positions) x lookback_period) instead of a pass over the
+    whole history, for callers that only need a few draws.
+    """
+    plain = np.zeros((len(positions), 49), dtype=np.int64)
+    indexed = np.zeros((len(positions), 49), dtype=np.int64)
+    window_size = np.zeros(len(positions), dtype=np.intp)
+    order = np.zeros((len(positions), 49), dtype=np.int64)
+    for row, position in enumerate(positions):
+        start, stop = history.window(position, lookback_period)
+        drawn = drawn_incidence(history, start, stop)
+        plain[row], indexed[row] = window_counts(drawn)
+        window_size[row] = len(drawn)
+        order[row] = first_seen_order(drawn, history.additional[start:stop])
+    return plain, indexed, window_size, order
+
+def rolling_suggestions(history, lookback_period, least_weight=0.1, start=0, stop=None,
+                        num_picks=6):
+    """Suggested numbers for every draw in one vectorized sliding-window pass.
+
+    Row i of the result is the ticket calculate_weighted_frequencies and
+    get_suggested_numbers would pick for the draw at row start + i of history.
+    """
+    state = rolling_window_state(history, lookback_period, start, stop)
+    return weighted_tickets(state, least_weight, num_picks)
+
+def played_suggestions(history, lookback_period, least_weight, positions, num_picks=6):
+    """rolling_suggestions for the draws at positions, computed over the rows they span."""
+    if not len(positions):
+        return np.zeros((0, num_picks), dtype=np.uint8)
+    start = int(positions.min())
+    tickets = rolling_suggestions(history, lookback_period, least_weight, start, int(positions.max()) + 1,
+                                  num_picks)
+    return tickets[positions - start]
+
+def weighted_tickets(state, least_weights, num_picks=6):
+    """Tickets of the weighted frequency strategy from precomputed window state.
+
+    state is (plain, indexed, window_size, order) as returned by
+    rolling_window_state. least_weights is one least weight for every draw,
+    an (n_draws, 1) array of one per draw, or an (n_weights, 1, 1) array
+    giving a ticket per weight and draw. Every path that plays the weighted
+    strategy picks its tickets here.
+    """
+    plain, indexed, window_size, order = state
+    frequencies = linear_weighted_frequencies(plain, indexed, window_size[:, None], least_weights)
+    return suggest_tickets(frequencies, order, num_picks)
+
+def backtest_positions(history, lookback_period, start_draw=None, end_draw=None):
+    """Row positions of the draws a backtest plays, in the order of history."""
+    draws = history.draws
+    # Draws without enough earlier draws for a full lookback are skipped
+    earlier_draws = history.earlier_draws(np.arange(len(draws)))
+    playable = earlier_draws >= lookback_period
+    if start_draw:
+        playable &= draws <= start_draw
+    if end_draw:
+        playable &= draws >= end_draw
+    return np.flatnonzero(playable)
+
+def playable_positions(history, lookback, positions=None):
+    """Every playable row position, or those of positions with a full lookback."""
+    if positions is None:
+        return backtest_positions(history, lookback)
+    positions = np.asarray(positions, dtype=np.intp)
+    return positions[history.earlier_draws(positions) >= lookback]
+
+@profiled
+def evaluate_lookback(history, lookback, weights, positions=None, num_picks=6, strategy=DEFAULT_STRATEGY):
+    """Per-draw prizes of every least weight for one lookback period.
+
+    The window sums are computed once and shared by all weights, which are
+    then ranked and scored in batches. By default every playable draw is
+    scored; pass positions to score only those rows (draws without a full
+    lookback among them are dropped). num_picks of 7-12 scores System
+    entries. Any other registered strategy is scored from its batch kernel
+    (see toto_strategies.evaluate_strategy). Returns the row positions of
+    the played draws and a (len(weights), len(positions)) prize array.
+    """
+    if strategy != DEFAULT_STRATEGY:
+        from toto_strategies import evaluate_strategy
+        return evaluate_strategy(history, strategy, lookback, weights, positions, num_picks)
+    positions = playable_positions(history, lookback, positions)
+    
+    # A few rows: build their windows directly; otherwise slide over the rows they span
+    if len(positions) < MAX_DIRECT_POSITIONS:
+        state = window_state_at(history, positions, lookback)
+    else:
+        start = int(positions.min())
+        state = rolling_window_state(history, lookback, start, int(positions.max()) + 1)
+        state = tuple(array[positions - start] for array in state)
+    prizes = score_window_state(state, history.numbers[positions], history.additional[positions],
+                                weights, num_picks, history.payouts[positions])
+    return positions, prizes
+
+def score_window_state(state, numbers, additional, weights, num_picks=6, payouts=None):
+    """Prizes of every least weight on draws with precomputed window state.
+
+    state is (plain, indexed, window_size, order) for the draws whose winning
+    incidence rows, additional numbers and group prizes (payouts, see
+    score_masks) are given. Weights are ranked and scored in batches of
+    bounded size. Returns a (len(weights), n_draws) prize array.
+    """
+    plain = state[0]
+    weights = np.asarray(weights, dtype=float)
+    prizes = np.zeros((len(weights), len(plain)), dtype=np.int64)
+    batch = max(1, MAX_BATCH_ELEMENTS // max(1, plain.size))
+    for start in range(0, len(weights), batch):
+        tickets = weighted_tickets(state, weights[start:start + batch, None, None], num_picks)
+        prizes[start:start + batch] = score_tickets(tickets, numbers, additional, payouts)
+    return prizes
+
+def decay_factors(half_lives):
+    """Per-draw decay factors of weights that halve every half_life draws."""
+    return 0.5 ** (1.0 / np.asarray(half_lives, dtype=float))
+
+@profiled
+def decayed_frequency_blocks(history, half_lives, positions):
+    """Exponentially decayed frequencies before the draws at positions, for every half-life.
+
+    The frequency of a number is the sum of decay ** age over all earlier
+    draws it appears in, age 0 being the previous draw. One 49-element
+    vector per half-life is carried from the oldest draw forward as
+    f = decay * f + drawn, so every draw costs the same whatever the
+    half-life, and all half-lives share the pass. The tie-break order
+    (first_seen_order over all earlier draws) is carried along the same way.
+    Yields (rows, frequencies, order) in blocks of bounded size, oldest
+    draws first: rows index positions, frequencies is
+    (len(half_lives), len(rows), 49) and order (len(rows), 49).
+    """
+    decay = decay_factors(np.atleast_1d(half_lives))[:, None]
+    if np.any(~(decay > 0) | (decay >= 1)):
+        raise ValueError("Half-lives must be positive and finite")
+    positions = np.asarray(positions, dtype=np.intp)
+    drawn = drawn_incidence(history)
+    n = len(history)
+    numbers = np.arange(1, 50)
+    
+    frequencies = np.zeros((len(decay), 49))
+    # Row of each number's latest occurrence so far (n when not seen yet)
+    last_row = np.full(49, n, dtype=np.intp)
+    last_additional = np.zeros(49, dtype=bool)
+    next_row = n - 1
+    
+    batch = max(1, MAX_BATCH_ELEMENTS // (49 * len(decay)))
+    targets = np.argsort(-positions, kind='stable')
+    for begin in range(0, len(targets), batch):
+        rows = targets[begin:begin + batch]
+        block = np.empty((len(decay), len(rows), 49))
+        order = np.empty((len(rows), 49), dtype=np.int64)
+        for idx, position in enumerate(positions[rows]):
+            # Fold in every draw older than this one
+            while next_row > position:
+                frequencies *= decay
+                frequencies += drawn[next_row]
+                seen = drawn[next_row].astype(bool)
+                last_row[seen] = next_row
+                last_additional[seen] = history.additional[next_row] == numbers[seen]
+                next_row -= 1
+            block[:, idx] = frequencies
+            present = last_row < n
+            age = np.where(present, last_row - position - 1, history.earlier_draws(position))
+            order[idx] = age * 100 + (present & last_additional) * 50 + numbers
+        yield rows, block, order
+
+def decayed_suggestions(history, half_life, positions, num_picks=6):
+    """Tickets of the exponentially decayed strategy for the draws at positions."""
+    tickets = np.zeros((len(positions), num_picks), dtype=np.uint8)
+    for rows, frequencies, order in decayed_frequency_blocks(history, [half_life], positions):
+        tickets[rows] = suggest_tickets(frequencies[0], order, num_picks)
+    return tickets
+
+@profiled
+def evaluate_half_lives(history, half_lives, positions, num_picks=6):
+    """Per-draw prizes of the exponentially decayed strategy for every half-life.
+
+    All half-lives are updated in one pass over the history (see
+    decayed_frequency_blocks), so sweeping hundreds of them costs little
+    more than one. Returns a (len(half_lives), len(positions)) prize array.
+    """
+    positions = np.asarray(positions, dtype=np.intp)
+    prizes = np.zeros((len(half_lives), len(positions)), dtype=np.int64)
+    for rows, frequencies, order in decayed_frequency_blocks(history, half_lives, positions):
+        played = positions[rows]
+        tickets = suggest_tickets(frequencies, order, num_picks)
+        prizes[:, rows] = score_tickets(tickets, history.numbers[played], history.additional[played],
+                                        history.payouts[played])
+    return prizes
+
+def prize_totals(prizes, cost=1):
+    """Totals and per-draw metrics of one strategy's per-draw prizes."""
+    total_draws = len(prizes)
+    total_cost = total_draws * cost
+    total_prize = int(prizes.sum())
+    wins = int(np.count_nonzero(prizes))
+    
+    # Calculate metrics
+    avg_profit = (total_prize - total_cost) / total_draws if total_draws else 0
+    win_rate = (wins / total_draws * 100) if total_draws else 0
+    
+    return {
+        'Average_Profit': avg_profit,
+        'Win_Rate': win_rate,
+        'Total_Draws': total_draws,
+        'Total_Wins': wins,
+        'Total_Cost': total_cost,
+        'Total_Prize': total_prize,
+        'Net_Profit': total_prize - total_cost
+    }
+
+@profiled
+def summarize_prizes(lookback, least_weight, prizes, cost=1):
+    """Build a test_parameters result row from the per-draw prizes of one cell."""
+    return {'Lookback': lookback, 'Least_Weight': least_weight, **prize_totals(prizes, cost)}
+
+@profiled
+def run_backtest(data, lookback_period, start_draw=None, end_draw=None, least_weight=0.1,
+                 engine='rolling', num_picks=6, half_life=None, strategy=DEFAULT_STRATEGY):
+    """Run backtest over specified period.
+
+    engine='rolling' computes every ticket in one sliding-window pass;
+    engine='per_draw' recomputes the weighted frequencies for each draw.
+    Both produce the same tickets. num_picks of 7-12 plays System entries
+    at their full cost. With half_life, numbers are instead ranked by
+    exponentially decayed frequencies over all earlier draws (see
+    decayed_frequency_blocks); lookback_period then only sets how many
+    earlier draws a draw needs to be played, and least_weight and engine
+    are ignored. strategy selects any other registered strategy (see
+    toto_strategies), played with its batch kernel; it cannot be combined
+    with half_life. Returns a BacktestResults with the total cost, total
+    prize and number of wins.
+    """
+    history = as_draw_history(data)
+    cost = entry_cost(num_picks)
+    tickets_for = None
+    if half_life is not None and strategy != DEFAULT_STRATEGY:
+        raise ValueError(f"half_life plays the exponential-decay strategy and cannot be combined with {strategy}")
+    if half_life is not None:
+        tickets_for = lambda positions: decayed_suggestions(history, half_life, positions, num_picks)
+    elif strategy != DEFAULT_STRATEGY:
+        if engine != 'rolling':
+            raise ValueError(f"The {engine} engine only plays the weighted strategy")
+        from toto_strategies import strategy_tickets
+        tickets_for = lambda positions: strategy_tickets(history, strategy, lookback_period, least_weight,
+                                                         positions, num_picks)
+    elif engine == 'rolling':
+        tickets_for = lambda positions: played_suggestions(history, lookback_period, least_weight, positions,
+                                                           num_picks)
+    if tickets_for:
+        return _run_ticket_backtest(history, lookback_period, start_draw, end_draw, num_picks, tickets_for)
+    if engine != 'per_draw':
+        raise ValueError(f"Unknown backtest engine: {engine}")
+
+    positions = []
+    tickets = []
+    prizes = []
     
     # Get draw numbers to test
-    draws = data['Draw'].values
+    draws = history.draws
     if start_draw:
         draws = draws[draws <= start_draw]
     if end_draw:
         draws = draws[draws >= end_draw]
     
-    total_cost = 0
-    total_prize = 0
-    wins = 0
-    
     for draw in draws:
         # Skip last few draws where we don't have enough lookback data
-        if len(data[data['Draw'] < draw]) < lookback_period:
+        target_idx = history.position(draw)
+        if history.earlier_draws(target_idx) < lookback_period:
             continue
             
         # Calculate suggested numbers for this draw
-        weighted_frequencies = calculate_weighted_frequencies(data, draw, lookback_period, least_weight)
-        suggested_numbers = get_suggested_numbers(weighted_frequencies)
+        weighted_frequencies = calculate_weighted_frequencies(history, draw, lookback_period, least_weight)
+        suggested_numbers = get_suggested_numbers(weighted_frequencies, num_picks)
         
         # Get actual results
-        target_row = data[data['Draw'] == draw].iloc[0]
-        actual_numbers, actual_winning = get_all_numbers_from_row(target_row)
-        actual_additional = actual_numbers[-1]
+        actual_winning, actual_additional = get_draw_numbers(history, target_idx)
         
         # Calculate prize
-        prize = check_winning(suggested_numbers, actual_winning, actual_additional)
+        prize = check_winning(suggested_numbers, actual_winning, actual_additional,
+                              history.payouts[target_idx])
         
         # Record result
-        result = {
-            'Draw': draw,
-            'Date': target_row['Date'],
-            'Suggested_Numbers': suggested_numbers,
-            'Winning_Numbers': actual_winning,
-            'Additional_Number': actual_additional,
-            'Prize': prize,
-            'Profit': prize - 1
-        }
-        results.append(result)
+        positions.append(target_idx)
+        tickets.append(suggested_numbers)
+        prizes.append(prize)
+    
+    results = BacktestResults.from_positions(history, np.array(positions, dtype=np.intp),
+                                             np.array(tickets).reshape(-1, num_picks), prizes, cost)
+    return results, results.total_cost, results.total_prize, results.wins
+
+def _run_ticket_backtest(history, lookback_period, start_draw, end_draw, num_picks, tickets_for):
+    """Play the tickets tickets_for(positions) picks for the draws a backtest covers.
+
+    Shared by every engine of run_backtest except per_draw, so they select,
+    score and report draws the same way and differ only in their tickets.
+    """
+    positions = backtest_positions(history, lookback_period, start_draw, end_draw)
+    tickets = tickets_for(positions)
+    prizes = score_tickets(tickets, history.numbers[positions], history.additional[positions],
+                           history.payouts[positions])
+    results = BacktestResults.from_positions(history, positions, tickets, prizes, entry_cost(num_picks))
+    return results, results.total_cost, results.total_prize, results.wins
+
+def iter_backtest(data, lookback_period, start_draw=None, end_draw=None, chunk_size=10000, **kwargs):
+    """Run a backtest in chunks of draws, yielding running totals.
+
+    Takes the options of run_backtest, which plays each chunk. Yields
+    (results, total_cost, total_prize, wins) after each chunk, oldest chunk
+    last like run_backtest. results holds only that chunk's draws while the
+    totals cover every chunk so far, so callers that only need totals keep
+    one chunk in memory at a time. Decayed backtests (half_life) fold in
+    all older draws again for every chunk.
+    """
+    history = as_draw_history(data)
+    positions = backtest_positions(history, lookback_period, start_draw, end_draw)
+    
+    total_cost = 0
+    total_prize = 0
+    wins = 0
+    
+    for begin in range(0, len(positions), chunk_size):
+        chunk = positions[begin:begin + chunk_size]
+        results, _, _, _ = run_backtest(history, lookback_period, int(history.draws[chunk[0]]),
+                                        int(history.draws[chunk[-1]]), **kwargs)
         
         # Update statistics
-        total_cost += 1
-        total_prize += prize
-        if prize > 0:
-            wins += 1
-    
-    return results, total_cost, total_prize, wins
+        total_cost += results.total_cost
+        total_prize += results.total_prize
+        wins += results.wins
+        yield results, total_cost, total_prize, wins
+
+def parse_args():
+    """Parse command line options."""
+    # toto_strategies builds on this module, so it is imported here
+    from toto_strategies import add_strategy_argument
+    parser = argparse.ArgumentParser(description="Backtest the TOTO weighted frequency strategy.")
+    parser.add_argument('--picks', type=int, default=6,
+                        help="numbers per entry: 6 for Ordinary, 7-12 for System 7 to System 12")
+    add_strategy_argument(parser, "play")
+    parser.add_argument('--half-life', type=float,
+                        help="weight all earlier draws by exponential decay with this half-life in draws")
+    add_profile_argument(parser, 'toto_backtest')
+    args = parser.parse_args()
+    if args.half_life is not None and args.strategy != DEFAULT_STRATEGY:
+        parser.error("--half-life plays the exponential-decay strategy and cannot be combined with --strategy")
+    return args
 
 def main():
+    args = parse_args()
+    if args.profile:
+        enable_profiling()
     try:
         # Read the data
-        data = read_toto_data('ToTo.csv')
+        history = load_draw_history('ToTo.csv')
         
         # Get user input for lookback period
         while True:
@@ -70,38 +472,56 @@ def main():
             except ValueError:
                 print("Please enter a valid number.")
         
-        # Run backtest
-        results, total_cost, total_prize, wins = run_backtest(data, lookback, least_weight=0.1)
+        # Run backtest chunk by chunk, keeping only the winning draws
+        played = 0
+        total_cost = total_prize = wins = 0
+        winners = []
+        for results, total_cost, total_prize, wins in iter_backtest(history, lookback, least_weight=0.1,
+                                                                    num_picks=args.picks,
+                                                                    half_life=args.half_life,
+                                                                    strategy=args.strategy):
+            played += len(results)
+            winners.extend(results[idx] for idx in np.flatnonzero(results.prizes))
         
         # Print summary
         print("\nBacktest Results:")
-        print(f"Strategy: Using {lookback} previous draws for frequency analysis")
-        print(f"\nTotal draws played: {len(results)}")
+        if args.half_life:
+            print(f"Strategy: All previous draws, weights halving every {args.half_life:g} draws "
+                  f"(first {lookback} draws skipped)")
+        elif args.strategy != DEFAULT_STRATEGY:
+            print(f"Strategy: {args.strategy} numbers of the {lookback} previous draws")
+        else:
+            print(f"Strategy: Using {lookback} previous draws for frequency analysis")
+        if args.picks > 6:
+            print(f"Entry: System {args.picks} (${entry_cost(args.picks)} per draw)")
+        print(f"\nTotal draws played: {played}")
         print(f"Total cost: ${total_cost}")
         print(f"Total prize money: ${total_prize}")
         print(f"Net profit/loss: ${total_prize - total_cost}")
         print(f"Number of wins: {wins}")
-        if len(results) > 0:
-            print(f"Win rate: {wins/len(results)*100:.2f}%")
-            print(f"Average return per bet: ${(total_prize - total_cost)/len(results):.2f}")
+        if played > 0:
+            print(f"Win rate: {wins/played*100:.2f}%")
+            print(f"Average return per bet: ${(total_prize - total_cost)/played:.2f}")
         
         # Print detailed results for wins
         print("\nDetailed Results for Winning Draws:")
         print("-" * 80)
-        for result in results:
-            if result['Prize'] > 0:
-                print(f"\nDraw #{result['Draw']} ({result['Date']}):")
-                print(f"Suggested numbers: {result['Suggested_Numbers']}")
-                print(f"Winning numbers: {result['Winning_Numbers']}")
-                print(f"Additional number: {result['Additional_Number']}")
-                print(f"Prize: ${result['Prize']}")
-                print(f"Net profit: ${result['Profit']}")
-                print("-" * 40)
+        for result in winners:
+            print(f"\nDraw #{result['Draw']} ({result['Date']}):")
+            print(f"Suggested numbers: {result['Suggested_Numbers']}")
+            print(f"Winning numbers: {result['Winning_Numbers']}")
+            print(f"Additional number: {result['Additional_Number']}")
+            print(f"Prize: ${result['Prize']}")
+            print(f"Net profit: ${result['Profit']}")
+            print("-" * 40)
 
     except FileNotFoundError:
         print("Error: ToTo.csv file not found in the current directory.")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+    finally:
+        if args.profile:
+            write_profile(args.profile)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
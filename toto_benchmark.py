@@ -0,0 +1,252 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import pandas as pd
+import numpy as np
+from toto_profile import enable_profiling, write_profile, add_profile_argument
+from toto_analyzer import (WINNING_COLUMNS, ADDITIONAL_COLUMN, DATE_FORMAT, read_toto_data,
+                           load_draw_history, calculate_weighted_frequencies)
+from toto_backtest import run_backtest
+from toto_optimize import test_parameters
+from toto_trend_analysis import analyze_yearly_trends
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+RESULTS_FILE = 'benchmark_results.json'
+FIRST_DRAW = 1
+LAST_DATE = pd.Timestamp('2024-12-30')
+# Earliest date pandas can hold; large histories draw more than once a day
+EARLIEST_DATE = pd.Timestamp('1700-01-01')
+DRAW_INTERVAL_DAYS = 3.5
+GENERATE_CHUNK = 100000
+FREQUENCY_TARGETS = 1000
+# Timings below this are too noisy to flag as regressions
+MIN_SECONDS = 0.005
+
+# Modules whose import time is measured, each in a fresh interpreter
+IMPORT_MODULES = ['toto_analyzer', 'toto_backtest', 'toto_compute', 'toto_optimize',
+                  'toto_trend_analysis', 'toto_random_analysis']
+
+# Prize range of each group (low, high); fixed groups have low == high
+PRIZE_RANGES = [(1000000, 5000000), (50000, 300000), (1000, 3000), (200, 600), (50, 50), (25, 25), (10, 10)]
+
+def generate_history(num_draws, seed=0):
+    """Synthetic draw history in the ToTo.csv layout, newest draw first.
+
+    Each draw has 6 distinct winning numbers (sorted) and a distinct
+    additional number from 1-49, a date on the regular twice-weekly cadence
+    ending at LAST_DATE (more frequent when the history would otherwise
+    start before EARLIEST_DATE), and a prize for each of the 7 groups. The
+    same size and seed always give the same history.
+    """
+    rng = np.random.default_rng(seed)
+    numbers = np.empty((num_draws, 7), dtype=np.uint8)
+    for start in range(0, num_draws, GENERATE_CHUNK):
+        stop = min(start + GENERATE_CHUNK, num_draws)
+        picks = np.argsort(rng.random((stop - start, 49)), axis=1)[:, :7] + 1
+        numbers[start:stop, :6] = np.sort(picks[:, :6], axis=1)
+        numbers[start:stop, 6] = picks[:, 6]
+    
+    interval = min(DRAW_INTERVAL_DAYS, (LAST_DATE - EARLIEST_DATE).days / max(num_draws, 1))
+    days_before_last = np.arange(num_draws) * interval
+    dates = LAST_DATE - pd.to_timedelta(np.floor(days_before_last), unit='D')
+    
+    data = pd.DataFrame({
+        'Draw': FIRST_DRAW + num_draws - 1 - np.arange(num_draws),
+        'Date': dates.strftime(DATE_FORMAT)
+    })
+    for idx, col in enumerate(WINNING_COLUMNS):
+        data[col] = numbers[:, idx]
+    data[ADDITIONAL_COLUMN] = numbers[:, 6]
+    for group, (low, high) in enumerate(PRIZE_RANGES, start=1):
+        prizes = rng.integers(low, high + 1, num_draws)
+        data[f'Group {group} Prize'] = [f"${prize:,}" for prize in prizes] if group <= 2 else prizes
+    return data
+
+def write_history(file_path, num_draws, seed=0):
+    """Write a synthetic ToTo.csv-compatible file."""
+    generate_history(num_draws, seed).to_csv(file_path, index=False)
+
+def time_call(func, repeats):
+    """Wall times in seconds of repeated calls, with their printed output discarded."""
+    times = []
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    return times
+
+def time_import(module, repeats):
+    """Wall times in seconds of importing module in fresh interpreters."""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    return [float(subprocess.run([sys.executable, '-c', code], cwd=cwd, capture_output=True,
+                                 text=True, check=True).stdout)
+            for _ in range(repeats)]
+
+def benchmark_cases(file_path):
+    """Named benchmark callables for one synthetic history file."""
+    history = load_draw_history(file_path)
+    targets = history.draws[np.linspace(0, len(history) - 1, FREQUENCY_TARGETS).astype(int)].tolist()
+    
+    def weighted_frequencies():
+        for target_draw in targets:
+            calculate_weighted_frequencies(history, target_draw, 10)
+    
+    return {
+        'read_toto_data': lambda: read_toto_data(file_path, use_cache=False),
+        'read_toto_data_cached': lambda: read_toto_data(file_path),
+        'calculate_weighted_frequencies': weighted_frequencies,
+        'run_backtest': lambda: run_backtest(history, 10),
+        'test_parameters': lambda: test_parameters(history, lookback_range=(1, 5), weight_step=0.3),
+        'analyze_yearly_trends': lambda: analyze_yearly_trends(history)
+    }
+
+def timing_result(name, size, times):
+    """Result dict of one benchmark at one size."""
+    return {
+        'benchmark': name,
+        'size': size,
+        'best': min(times),
+        'median': float(np.median(times)),
+        'times': times
+    }
+
+def run_benchmarks(sizes=DEFAULT_SIZES, seed=0, repeats=3, only=None):
+    """Time every benchmark at every size on seeded synthetic histories.
+
+    Module import times are measured first, with size 0. Returns a list of
+    result dicts with the benchmark name, size, best and median time and all
+    timings in seconds.
+    """
+    results = []
+    for module in IMPORT_MODULES:
+        name = f'import_{module}'
+        if only and name not in only:
+            continue
+        results.append(timing_result(name, 0, time_import(module, repeats)))
+        print(f"  {name:<32} {min(results[-1]['times']):10.4f}s")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            file_path = os.path.join(tmp_dir, f'ToTo_{size}.csv')
+            print(f"Generating {size} draws...")
+            write_history(file_path, size, seed)
+    
+            for name, func in benchmark_cases(file_path).items():
+                if only and name not in only:
+                    continue
+                times = time_call(func, repeats)
+                results.append(timing_result(name, size, times))
+                print(f"  {name:<32} {min(times):10.4f}s")
+    return results
+
+def save_benchmarks(results, file_path, seed, repeats):
+    """Write benchmark results with the environment they were measured in."""
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seed': seed,
+        'repeats': repeats,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'results': results
+    }
+    with open(file_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+def compare_benchmarks(results, baseline_path, threshold=1.25, min_seconds=MIN_SECONDS):
+    """Compare best times against a stored baseline.
+
+    Returns one row per benchmark and size present in both, with the ratio
+    of current to baseline time; rows slower than threshold times the
+    baseline are flagged as regressions, unless both times are under
+    min_seconds.
+    """
+    with open(baseline_path) as f:
+        baseline = {(r['benchmark'], r['size']): r['best'] for r in json.load(f)['results']}
+    
+    rows = []
+    for result in results:
+        key = (result['benchmark'], result['size'])
+        if key not in baseline:
+            continue
+        ratio = result['best'] / baseline[key] if baseline[key] > 0 else float('inf')
+        rows.append({
+            'Benchmark': result['benchmark'],
+            'Size': result['size'],
+            'Baseline': baseline[key],
+            'Current': result['best'],
+            'Ratio': ratio,
+            'Regression': ratio > threshold and max(result['best'], baseline[key]) >= min_seconds
+        })
+    return pd.DataFrame(rows, columns=['Benchmark', 'Size', 'Baseline', 'Current', 'Ratio', 'Regression'])
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Benchmark the TOTO analysis on synthetic histories.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="numbers of draws in the synthetic histories")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="random seed for the synthetic histories")
+    parser.add_argument('--repeats', type=int, default=3,
+                        help="timed runs per benchmark; the best is compared")
+    parser.add_argument('--only', nargs='+',
+                        help="run only these benchmarks")
+    parser.add_argument('--output', default=RESULTS_FILE,
+                        help="JSON file to write the results to")
+    parser.add_argument('--compare',
+                        help="baseline JSON file to check the results against")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="slowdown ratio over the baseline reported as a regression")
+    parser.add_argument('--min-time', type=float, default=MIN_SECONDS,
+                        help="seconds below which slowdowns are not reported")
+    parser.add_argument('--generate', metavar='FILE',
+                        help="only write a synthetic history of the first size to FILE")
+    add_profile_argument(parser, 'toto_benchmark', " (memory tracing slows the timed runs)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.profile:
+        enable_profiling()
+    try:
+        if args.generate:
+            write_history(args.generate, args.sizes[0], args.seed)
+            print(f"Wrote {args.sizes[0]} synthetic draws to '{args.generate}'")
+            return
+    
+        results = run_benchmarks(args.sizes, args.seed, args.repeats, args.only)
+        save_benchmarks(results, args.output, args.seed, args.repeats)
+        print(f"\nBenchmark results have been saved to '{args.output}'")
+    
+        if args.compare:
+            comparison = compare_benchmarks(results, args.compare, args.threshold, args.min_time)
+            print(f"\nComparison with '{args.compare}':")
+            print("=" * 50)
+            print(comparison.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+            regressions = comparison[comparison['Regression']]
+            if len(regressions):
+                print(f"\n{len(regressions)} regression(s) slower than {args.threshold}x the baseline")
+                raise SystemExit(1)
+            print("\nNo regressions")
+    
+    except FileNotFoundError as e:
+        print(f"Error: {e.filename} not found.")
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+    finally:
+        if args.profile:
+            write_profile(args.profile)
+
+if __name__ == "__main__":
+    main()
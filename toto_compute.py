@@ -0,0 +1,68 @@
+import argparse
+import json
+import sys
+from toto_profile import enable_profiling, write_profile, add_profile_argument
+from toto_analyzer import load_draw_history, entry_cost
+from toto_backtest import backtest_positions, evaluate_lookback, summarize_prizes, DEFAULT_STRATEGY
+from toto_strategies import add_strategy_argument
+
+def compute_cells(history, lookbacks, weights, start_draw=None, end_draw=None, num_picks=6,
+                  strategy=DEFAULT_STRATEGY):
+    """test_parameters result rows for every lookback x weight cell, as dicts."""
+    cost = entry_cost(num_picks)
+    results = []
+    for lookback in lookbacks:
+        positions = backtest_positions(history, lookback, start_draw, end_draw)
+        _, prizes = evaluate_lookback(history, lookback, weights, positions, num_picks, strategy)
+        results.extend(summarize_prizes(lookback, least_weight, cell_prizes, cost)
+                       for least_weight, cell_prizes in zip(weights, prizes))
+    return results
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Compute TOTO backtest totals as JSON.")
+    parser.add_argument('--file', default='ToTo.csv',
+                        help="draw history CSV")
+    parser.add_argument('--lookbacks', type=int, nargs='+', default=[10],
+                        help="lookback periods to backtest")
+    parser.add_argument('--weights', type=float, nargs='+', default=[0.1],
+                        help="least weights to backtest with every lookback")
+    parser.add_argument('--picks', type=int, default=6,
+                        help="numbers per entry: 6 for Ordinary, 7-12 for System 7 to System 12")
+    add_strategy_argument(parser, "backtest")
+    parser.add_argument('--start-draw', type=int,
+                        help="latest draw to play")
+    parser.add_argument('--end-draw', type=int,
+                        help="earliest draw to play")
+    parser.add_argument('--output',
+                        help="JSON file to write instead of standard output")
+    add_profile_argument(parser, 'toto_compute')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.profile:
+        enable_profiling()
+    try:
+        history = load_draw_history(args.file)
+        results = compute_cells(history, args.lookbacks, args.weights, args.start_draw, args.end_draw,
+                                args.picks, args.strategy)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+        else:
+            json.dump(results, sys.stdout, indent=2)
+            print()
+    except FileNotFoundError:
+        print(f"Error: {args.file} file not found in the current directory.", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"An error occurred: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if args.profile:
+            # Standard output carries the JSON results
+            write_profile(args.profile, sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,665 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from toto_backtest import run_backtest
-from toto_analyzer import read_toto_data
+from toto_profile import profiled, stage, enable_profiling, write_profile, add_profile_argument
+from toto_backtest import (backtest_positions, evaluate_lookback, summarize_prizes, evaluate_half_lives,
+                          prize_totals, MAX_BATCH_ELEMENTS, DEFAULT_STRATEGY)
+from toto_strategies import get_strategy, add_strategy_argument
+from toto_analyzer import load_draw_history, as_draw_history, DrawHistory, entry_cost
+from toto_render import pyplot, annotation_kwargs, input_digest, render_figures
 
+RESULTS_FILE = 'optimization_results.csv'
+# Draw coverage of RESULTS_FILE, used by incremental updates
+STATE_FILE = 'optimization_results.json'
+WALK_FORWARD_FILE = 'walk_forward_results.csv'
+ADAPTIVE_TRACE_FILE = 'adaptive_search_trace.csv'
+HEATMAP_FILE = 'toto_optimization_heatmaps.png'
+DECAY_RESULTS_FILE = 'decay_results.csv'
+DECAY_PLOT_FILE = 'toto_decay_half_lives.png'
+# Default half-life sweep of the exponential-decay strategy, geometrically spaced
+HALF_LIFE_RANGE = (0.5, 200)
+HALF_LIFE_COUNT = 200
+# Completed cells of an interrupted sweep; its key is kept in CHECKPOINT_FILE + '.json'
+CHECKPOINT_FILE = 'optimization_checkpoint.csv'
+CHECKPOINT_VERSION = 1
+# A checkpoint batch is written once it holds this many cells or is this old
+CHECKPOINT_ROWS = 1000
+CHECKPOINT_SECONDS = 30
+# Columns of a test_parameters result row; the integer ones are restored when
+# checkpointed rows are read back
+RESULT_COLUMNS = ['Lookback', 'Least_Weight', 'Average_Profit', 'Win_Rate', 'Total_Draws',
+                  'Total_Wins', 'Total_Cost', 'Total_Prize', 'Net_Profit']
+RESULT_INT_COLUMNS = ['Lookback', 'Total_Draws', 'Total_Wins', 'Total_Cost', 'Total_Prize', 'Net_Profit']
+# Block bootstrap of every cell's per-draw results (--bootstrap)
+BOOTSTRAP_SAMPLES = 2000
+BOOTSTRAP_BLOCK = 20
+CONFIDENCE = 0.95
+CI_METRICS = ['Average_Profit', 'Win_Rate', 'Net_Profit']
+CI_COLUMNS = [f'{metric}_{bound}' for metric in CI_METRICS for bound in ('Low', 'High')]
+
+def update_metrics(results_df):
+    """Recompute the derived columns of test_parameters results from the totals."""
+    total_draws = results_df['Total_Draws'].to_numpy()
+    played = np.maximum(total_draws, 1)
+    net_profit = results_df['Total_Prize'] - results_df['Total_Cost']
+    results_df['Net_Profit'] = net_profit
+    results_df['Average_Profit'] = np.where(total_draws > 0, net_profit / played, 0)
+    results_df['Win_Rate'] = np.where(total_draws > 0, results_df['Total_Wins'] / played * 100, 0)
+    return results_df
+
+@profiled
+def update_parameters(data, results_df, last_draw, num_picks=6, strategy=DEFAULT_STRATEGY):
+    """Fold draws newer than last_draw into existing test_parameters results.
+
+    Appending draws does not change the tickets of earlier draws, so only the
+    new draws are scored for each cell and added to its totals. The cost is
+    proportional to the number of new draws, not the length of the history.
+    Bootstrap interval columns are dropped. Returns the updated results and
+    the number of new draws.
+    """
+    history = as_draw_history(data)
+    new_positions = np.flatnonzero(history.draws > last_draw)
+    # Confidence intervals would no longer match the totals
+    results_df = results_df.drop(columns=[col for col in CI_COLUMNS if col in results_df])
+    if len(new_positions) == 0:
+        return results_df, 0
+    
+    for lookback, cells in results_df.groupby('Lookback', sort=False):
+        print(f"Updating Lookback={lookback} with {len(new_positions)} new draws")
+        _, prizes = evaluate_lookback(history, lookback, cells['Least_Weight'].to_numpy(), new_positions,
+                                      num_picks, strategy)
+        results_df.loc[cells.index, 'Total_Draws'] += prizes.shape[1]
+        results_df.loc[cells.index, 'Total_Cost'] += prizes.shape[1] * entry_cost(num_picks)
+        results_df.loc[cells.index, 'Total_Wins'] += np.count_nonzero(prizes, axis=1)
+        results_df.loc[cells.index, 'Total_Prize'] += prizes.sum(axis=1)
+    
+    return update_metrics(results_df), len(new_positions)
+
+def save_results(results_df, history, num_picks=6, strategy=DEFAULT_STRATEGY, results_file=RESULTS_FILE,
+                 state_file=STATE_FILE):
+    """Save optimization results with the draw coverage needed to update them later.
+
+    The state file records the last draw covered and a digest of all covered
+    draws, so load_results can tell when any of them were changed.
+    """
+    results_df.to_csv(results_file, index=False)
+    with open(state_file, 'w') as f:
+        json.dump({'last_draw': int(history.draws[0]), 'history_draws': len(history),
+                   'data': history_digest(history), 'num_picks': num_picks, 'strategy': strategy}, f)
+
+def load_results(history, results_file=RESULTS_FILE, state_file=STATE_FILE):
+    """Load saved optimization results, the last draw they cover, their entry size and strategy.
+
+    Returns (None, None, None, None) when there is nothing to update from. Raises
+    ValueError if draws up to the saved last draw were added, removed or
+    corrected since (their numbers or prizes no longer match the saved digest).
+    """
+    import pandas as pd
+    if not (os.path.exists(results_file) and os.path.exists(state_file)):
+        return None, None, None, None
+    with open(state_file) as f:
+        state = json.load(f)
+    covered = np.flatnonzero(history.draws <= state['last_draw'])
+    if (len(covered) != state['history_draws']
+            or history_digest(history, covered) != state.get('data')):
+        raise ValueError("Draws covered by the saved results have changed; "
+                         "rerun without --incremental")
+    return (pd.read_csv(results_file), state['last_draw'], state.get('num_picks', 6),
+            state.get('strategy', DEFAULT_STRATEGY))
+
+def history_digest(history, positions=slice(None)):
+    """SHA-256 of the draw numbers, results and prizes of a DrawHistory, or of its rows at positions."""
+    digest = hashlib.sha256()
+    for array in (history.draws, history.numbers, history.additional, history.payouts):
+        digest.update(np.ascontiguousarray(array[positions]).tobytes())
+    return digest.hexdigest()
+
+class SweepCheckpoint:
+    """Completed cells of a parameter sweep, appended to a CSV in batches.
+
+    The checkpoint is keyed by the draw data, the lookback and weight grid,
+    the entry size and the strategy. An existing checkpoint with the same key is resumed
+    and its cells skipped; any other is discarded. Cells are buffered and
+    written once CHECKPOINT_ROWS cells or CHECKPOINT_SECONDS have
+    accumulated, and on flush(). Rows that were only partly written when a
+    run died are dropped on load, and the file is rewritten without them so
+    later batches are appended after complete lines.
+    """
+    
+    def __init__(self, file_path, history, lookbacks, weights, num_picks=6, strategy=DEFAULT_STRATEGY):
+        self.file_path = file_path
+        self.key_file = file_path + '.json'
+        self.key = {
+            'version': CHECKPOINT_VERSION,
+            'data': history_digest(history),
+            'lookbacks': [int(lookback) for lookback in lookbacks],
+            'weights': [round(float(weight), 10) for weight in weights],
+            'num_picks': num_picks,
+            'strategy': strategy
+        }
+        self.cells = {}
+        self._buffer = []
+        self._last_write = time.monotonic()
+        
+        if self._load_key() == self.key and os.path.exists(self.file_path):
+            for row in self._load_rows():
+                self.cells[self._cell(row['Lookback'], row['Least_Weight'])] = row
+        else:
+            self.remove()
+            with open(self.key_file, 'w') as f:
+                json.dump(self.key, f)
+    
+    def _load_key(self):
+        if not os.path.exists(self.key_file):
+            return None
+        with open(self.key_file) as f:
+            return json.load(f)
+    
+    def _load_rows(self):
+        """Complete rows of the checkpoint file, rewriting it with only those."""
+        import pandas as pd
+        try:
+            saved = pd.read_csv(self.file_path, on_bad_lines='skip')
+        except pd.errors.EmptyDataError:
+            saved = pd.DataFrame()
+        if not set(RESULT_COLUMNS).issubset(saved.columns):
+            # Not even the header was written completely
+            os.remove(self.file_path)
+            return []
+        
+        saved = saved[RESULT_COLUMNS].apply(pd.to_numeric, errors='coerce').dropna()
+        saved = saved[saved['Net_Profit'] == saved['Total_Prize'] - saved['Total_Cost']]
+        saved = saved.astype({col: np.int64 for col in RESULT_INT_COLUMNS})
+        # Replace the file in one step, so a run dying here leaves either version
+        temp_path = self.file_path + '.tmp'
+        saved.to_csv(temp_path, index=False)
+        os.replace(temp_path, self.file_path)
+        return saved.to_dict('records')
+    
+    @staticmethod
+    def _cell(lookback, least_weight):
+        return int(lookback), round(float(least_weight), 10)
+    
+    def remaining(self, lookback, weights):
+        """The weights of a lookback that have no completed cell yet."""
+        return np.array([weight for weight in weights if self._cell(lookback, weight) not in self.cells])
+    
+    def add(self, rows):
+        """Record completed result rows, writing a batch when one is due."""
+        for row in rows:
+            self.cells[self._cell(row['Lookback'], row['Least_Weight'])] = row
+        self._buffer.extend(rows)
+        if (len(self._buffer) >= CHECKPOINT_ROWS
+                or time.monotonic() - self._last_write >= CHECKPOINT_SECONDS):
+            self.flush()
+    
+    def flush(self):
+        """Append buffered rows to the checkpoint file."""
+        import pandas as pd
+        if self._buffer:
+            pd.DataFrame(self._buffer).to_csv(self.file_path, mode='a', index=False,
+                                              header=not os.path.exists(self.file_path))
+            self._buffer = []
+        self._last_write = time.monotonic()
+    
+    def rows(self, lookbacks, weights):
+        """Result rows of the whole grid in test_parameters order."""
+        return [self.cells[self._cell(lookback, weight)] for lookback in lookbacks for weight in weights]
+    
+    def remove(self):
+        """Delete the checkpoint files."""
+        for file_path in (self.file_path, self.key_file):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+def evaluate_cells(history, lookback, weights, num_picks=6, strategy=DEFAULT_STRATEGY):
+    """test_parameters result rows for one lookback and a run of least weights."""
+    _, prizes = evaluate_lookback(history, lookback, weights, num_picks=num_picks, strategy=strategy)
+    cost = entry_cost(num_picks)
+    return [summarize_prizes(lookback, least_weight, cell_prizes, cost)
+            for least_weight, cell_prizes in zip(weights, prizes)]
+
+@profiled
 def test_parameters(data, lookback_range=(1, 20), lookback_step=1, 
-                   weight_range=(0.1, 1), weight_step=0.1):
-    """Test different combinations of lookback periods and least weights."""
-    results = []
+                   weight_range=(0.1, 1), weight_step=0.1, workers=1, num_picks=6,
+                   checkpoint_file=None, strategy=DEFAULT_STRATEGY):
+    """Test different combinations of lookback periods and least weights.
+
+    Each lookback's window sums are computed once and every least weight is
+    scored from them in one batched pass. With workers > 1 the grid is split
+    into chunks evaluated in a process pool (see parallel_sweep). num_picks
+    of 7-12 plays System entries at their full cost. strategy sweeps any
+    registered strategy (see toto_strategies) instead of the weighted
+    frequencies; the least weight is passed to its kernel. With checkpoint_file,
+    completed cells are saved as the sweep goes (see SweepCheckpoint) and a
+    rerun over the same data and grid only evaluates the missing cells, with
+    any number of workers; the checkpoint is removed once the sweep is done.
+    """
+    import pandas as pd
+    # Reject an unknown strategy before a checkpoint is written for it
+    get_strategy(strategy)
+    history = as_draw_history(data)
     
     lookbacks = np.arange(lookback_range[0], lookback_range[1] + 1, lookback_step)
     weights = np.arange(weight_range[0], weight_range[1] + 0.01, weight_step)
     
-    total_combinations = len(lookbacks) * len(weights)
-    current = 0
+    checkpoint = None
+    if checkpoint_file:
+        checkpoint = SweepCheckpoint(checkpoint_file, history, lookbacks, weights, num_picks, strategy)
+        if checkpoint.cells:
+            print(f"Resuming from {checkpoint_file}: "
+                  f"{len(checkpoint.cells)}/{len(lookbacks) * len(weights)} combinations done")
     
-    for lookback in lookbacks:
-        for least_weight in weights:
-            current += 1
-            print(f"Testing combination {current}/{total_combinations}: "
-                  f"Lookback={lookback}, Least Weight={least_weight:.1f}")
-            
-            # Run backtest for this parameter combination
-            backtest_results, total_cost, total_prize, wins = run_backtest(
-                data, lookback, least_weight=least_weight)
-            
-            # Calculate metrics
-            avg_profit = (total_prize - total_cost) / len(backtest_results) if backtest_results else 0
-            win_rate = (wins / len(backtest_results) * 100) if backtest_results else 0
+    try:
+        if workers > 1:
+            results = parallel_sweep(history, lookbacks, weights, workers, num_picks, checkpoint, strategy)
+        else:
+            results = []
+            total_combinations = len(lookbacks) * len(weights)
+            current = 0
             
-            result = {
-                'Lookback': lookback,
-                'Least_Weight': least_weight,
-                'Average_Profit': avg_profit,
-                'Win_Rate': win_rate,
-                'Total_Draws': len(backtest_results),
-                'Total_Wins': wins,
-                'Total_Cost': total_cost,
-                'Total_Prize': total_prize,
-                'Net_Profit': total_prize - total_cost
-            }
-            results.append(result)
+            for lookback in lookbacks:
+                remaining = checkpoint.remaining(lookback, weights) if checkpoint else weights
+                current += len(weights) - len(remaining)
+                if not len(remaining):
+                    continue
+                print(f"Testing combinations {current + 1}-{current + len(remaining)}/{total_combinations}: "
+                      f"Lookback={lookback}, Least Weight={remaining[0]:.1f}-{remaining[-1]:.1f}")
+                current += len(remaining)
+                rows = evaluate_cells(history, lookback, remaining, num_picks, strategy)
+                if checkpoint:
+                    checkpoint.add(rows)
+                else:
+                    results.extend(rows)
+    finally:
+        if checkpoint:
+            checkpoint.flush()
     
+    if checkpoint:
+        results = checkpoint.rows(lookbacks, weights)
+        checkpoint.remove()
     return pd.DataFrame(results)
 
-def plot_heatmaps(results_df):
+@profiled
+def bootstrap_intervals(data, results_df, n_samples=BOOTSTRAP_SAMPLES, block_size=BOOTSTRAP_BLOCK,
+                        confidence=CONFIDENCE, seed=0, num_picks=6, strategy=DEFAULT_STRATEGY):
+    """Block-bootstrap confidence intervals for every test_parameters cell.
+
+    The history is cut into consecutive blocks of block_size draws, which
+    keeps runs of nearby draws together, and each cell's profit, wins and
+    played draws are summed per block. A bootstrap sample redraws as many
+    blocks with replacement; samples are encoded as rows of block counts,
+    so the resampled totals of all cells come from one matrix product
+    instead of a loop per cell, and every cell sees the same resamples.
+    Returns a copy of results_df with _Low and _High columns for each of
+    CI_METRICS; the Net_Profit bounds are the Average_Profit bounds over the
+    cell's Total_Draws.
+    """
+    history = as_draw_history(data)
+    cost = entry_cost(num_picks)
+    n_blocks = -(-len(history) // block_size)
+    block_of = np.arange(len(history)) // block_size
+    
+    # Profit, wins and played draws of every cell in every block
+    sums = np.zeros((3, len(results_df), n_blocks))
+    for lookback, cells in results_df.groupby('Lookback', sort=False):
+        positions, prizes = evaluate_lookback(history, lookback, cells['Least_Weight'].to_numpy(),
+                                              num_picks=num_picks, strategy=strategy)
+        if not len(positions):
+            continue
+        rows = results_df.index.get_indexer(cells.index)
+        blocks, starts = np.unique(block_of[positions], return_index=True)
+        cell_blocks = np.ix_(rows, blocks)
+        sums[0][cell_blocks] = np.add.reduceat(prizes - cost, starts, axis=1)
+        sums[1][cell_blocks] = np.add.reduceat((prizes > 0).astype(np.int64), starts, axis=1)
+        sums[2][cell_blocks] = np.diff(np.append(starts, len(positions)))
+    
+    rng = np.random.default_rng(seed)
+    average_profit = np.empty((n_samples, len(results_df)), dtype=np.float32)
+    win_rate = np.empty((n_samples, len(results_df)), dtype=np.float32)
+    batch = max(1, MAX_BATCH_ELEMENTS // max(n_blocks, len(results_df)))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for start in range(0, n_samples, batch):
+            size = min(batch, n_samples - start)
+            picks = rng.integers(0, n_blocks, (size, n_blocks)) + np.arange(size)[:, None] * n_blocks
+            counts = np.bincount(picks.ravel(), minlength=size * n_blocks).reshape(size, n_blocks)
+            profit, wins, played = counts.astype(float) @ sums.transpose(0, 2, 1)
+            average_profit[start:start + size] = profit / played
+            win_rate[start:start + size] = wins / played * 100
+    
+    results_df = results_df.copy()
+    tail = (1 - confidence) / 2
+    for metric, samples in (('Average_Profit', average_profit), ('Win_Rate', win_rate)):
+        low, high = np.quantile(samples, [tail, 1 - tail], axis=0)
+        results_df[f'{metric}_Low'] = low.astype(float)
+        results_df[f'{metric}_High'] = high.astype(float)
+    results_df['Net_Profit_Low'] = results_df['Average_Profit_Low'] * results_df['Total_Draws']
+    results_df['Net_Profit_High'] = results_df['Average_Profit_High'] * results_df['Total_Draws']
+    return results_df
+
+@profiled
+def test_half_lives(data, half_lives=None, warmup=20, num_picks=6):
+    """Test the exponential-decay strategy over a range of half-lives.
+
+    Half-lives default to HALF_LIFE_COUNT values spaced geometrically over
+    HALF_LIFE_RANGE. All of them are evaluated in one recursive pass over
+    the history (see evaluate_half_lives). Draws with fewer than warmup
+    earlier draws are not played, so with the default the same draws are
+    played as by the longest lookback of the default test_parameters grid.
+    Returns one row per half-life with the test_parameters metrics.
+    """
+    import pandas as pd
+    history = as_draw_history(data)
+    if half_lives is None:
+        half_lives = np.geomspace(HALF_LIFE_RANGE[0], HALF_LIFE_RANGE[1], HALF_LIFE_COUNT)
+    half_lives = np.asarray(half_lives, dtype=float)
+    
+    positions = backtest_positions(history, warmup)
+    prizes = evaluate_half_lives(history, half_lives, positions, num_picks)
+    cost = entry_cost(num_picks)
+    return pd.DataFrame([{'Half_Life': half_life, **prize_totals(cell_prizes, cost)}
+                         for half_life, cell_prizes in zip(half_lives, prizes)])
+
+def grid_draw_prizes(history, lookbacks, weights, num_picks=6, strategy=DEFAULT_STRATEGY):
+    """Per-draw prizes of every lookback x weight cell over the whole history.
+
+    Returns the cells as a DataFrame of Lookback and Least_Weight in the row
+    order of test_parameters, a (cells, n_draws) prize array in history row
+    order, and a matching boolean array marking the draws each cell plays.
+    """
+    import pandas as pd
+    cells = pd.DataFrame([(lookback, least_weight) for lookback in lookbacks for least_weight in weights],
+                         columns=['Lookback', 'Least_Weight'])
+    prizes = np.zeros((len(cells), len(history)), dtype=np.int64)
+    played = np.zeros((len(cells), len(history)), dtype=bool)
+    for idx, lookback in enumerate(lookbacks):
+        rows = slice(idx * len(weights), (idx + 1) * len(weights))
+        positions, lookback_prizes = evaluate_lookback(history, lookback, weights, num_picks=num_picks,
+                                                       strategy=strategy)
+        prizes[rows, positions] = lookback_prizes
+        played[rows, positions] = True
+    return cells, prizes, played
+
+@profiled
+def walk_forward(data, train_draws=500, test_draws=50, expanding=True, metric='Net_Profit',
+                 lookback_range=(1, 20), lookback_step=1, weight_range=(0.1, 1), weight_step=0.1,
+                 num_picks=6, strategy=DEFAULT_STRATEGY):
+    """Walk-forward out-of-sample evaluation of the parameter grid.
+
+    Draws are split chronologically into folds of test_draws. For each fold
+    the cell with the best metric ('Net_Profit' or 'Average_Profit') over the
+    preceding training window (all earlier draws if expanding, otherwise the
+    last train_draws) is played on the fold's draws. Per-draw prizes of every
+    cell are computed once and fold totals come from running sums, so each
+    fold only costs one pass over the cells. strategy plays any registered
+    strategy (see toto_strategies) over the grid.
+
+    Returns the stitched out-of-sample results (one row per played draw) and
+    a per-fold summary.
+    """
+    import pandas as pd
+    history = as_draw_history(data)
+    lookbacks = np.arange(lookback_range[0], lookback_range[1] + 1, lookback_step)
+    weights = np.arange(weight_range[0], weight_range[1] + 0.01, weight_step)
+    cost = entry_cost(num_picks)
+    
+    cells, prizes, played = grid_draw_prizes(history, lookbacks, weights, num_picks, strategy)
+    
+    # Chronological order (oldest first) with running totals per cell
+    prizes, played = prizes[:, ::-1], played[:, ::-1]
+    draws = history.draws[::-1]
+    dates = history.dates[::-1] if history.dates is not None else None
+    running_prize = np.zeros((len(cells), len(history) + 1), dtype=np.int64)
+    np.cumsum(prizes, axis=1, out=running_prize[:, 1:])
+    running_played = np.zeros((len(cells), len(history) + 1), dtype=np.int64)
+    np.cumsum(played, axis=1, out=running_played[:, 1:])
+    
+    folds = []
+    series = []
+    for fold, test_start in enumerate(range(train_draws, len(history), test_draws)):
+        test_stop = min(test_start + test_draws, len(history))
+        train_start = 0 if expanding else test_start - train_draws
+        
+        # Select the best cell on the training window
+        train_played = running_played[:, test_start] - running_played[:, train_start]
+        train_net = (running_prize[:, test_start] - running_prize[:, train_start]) - train_played * cost
+        if metric == 'Net_Profit':
+            scores = train_net.astype(float)
+        elif metric == 'Average_Profit':
+            scores = np.where(train_played > 0, train_net / np.maximum(train_played, 1), -np.inf)
+        else:
+            raise ValueError(f"Unknown walk-forward metric: {metric}")
+        best = int(np.argmax(scores))
+        lookback, least_weight = cells['Lookback'].iat[best], cells['Least_Weight'].iat[best]
+        
+        # Play it on the test block
+        test_rows = np.arange(test_start, test_stop)[played[best, test_start:test_stop]]
+        test_prizes = prizes[best, test_rows]
+        series.append(pd.DataFrame({
+            'Fold': fold,
+            'Draw': draws[test_rows],
+            'Date': dates[test_rows] if dates is not None else pd.NaT,
+            'Lookback': lookback,
+            'Least_Weight': least_weight,
+            'Prize': test_prizes,
+            'Profit': test_prizes - cost
+        }))
+        folds.append({
+            'Fold': fold,
+            'Train_Start_Draw': draws[train_start],
+            'Test_Start_Draw': draws[test_start],
+            'Test_End_Draw': draws[test_stop - 1],
+            'Lookback': lookback,
+            'Least_Weight': least_weight,
+            'Train_' + metric: scores[best],
+            'Test_Draws': len(test_rows),
+            'Test_Wins': int(np.count_nonzero(test_prizes)),
+            'Test_Net_Profit': int(test_prizes.sum()) - len(test_rows) * cost
+        })
+    
+    out_of_sample = pd.concat(series, ignore_index=True) if series else pd.DataFrame()
+    if len(out_of_sample):
+        out_of_sample['Cumulative_Profit'] = out_of_sample['Profit'].cumsum()
+    return out_of_sample, pd.DataFrame(folds)
+
+@profiled
+def adaptive_search(data, lookback_range=(1, 200), weight_range=(0.1, 1.0), n_candidates=243, eta=3,
+                    refine_rounds=2, n_final=5, seed=0, num_picks=6, strategy=DEFAULT_STRATEGY):
+    """Successive-halving search over lookback and least weight.
+
+    Each round samples n_candidates (integer lookback, continuous least
+    weight) and scores them on a growing random subset of draws: after every
+    rung only the best 1/eta are kept and the subset grows eta-fold, up to
+    every draw playable with the largest lookback. Later rounds sample around
+    the best candidate so far in a neighbourhood that halves each round.
+    Scores accumulate per candidate, so a draw is never scored twice for the
+    same candidate. The n_final best candidates are then evaluated on their
+    full backtest. strategy searches any registered strategy (see
+    toto_strategies).
+
+    Returns results in the test_parameters schema for the final candidates,
+    and an evaluation trace with one row per candidate per rung. The trace's
+    New_Draws column sums to the draw evaluations spent during the search.
+    """
+    import pandas as pd
+    history = as_draw_history(data)
+    rng = np.random.default_rng(seed)
+    cost = entry_cost(num_picks)
+    
+    # Shared draw order: every candidate sees the same nested subsets
+    pool = rng.permutation(backtest_positions(history, lookback_range[1]))
+    n_rungs = max(1, int(np.ceil(np.log(n_candidates) / np.log(eta))))
+    budgets = [max(1, int(len(pool) * eta ** (rung - n_rungs + 1))) for rung in range(n_rungs)]
+    
+    # (lookback, least_weight) -> [draws scored, total prize]
+    scores = {}
+    trace = []
+    
+    def score(candidates, budget):
+        """Bring every candidate up to budget scored draws; return their average profit."""
+        by_lookback = {}
+        for candidate in candidates:
+            entry = scores.setdefault(candidate, [0, 0])
+            if entry[0] < budget:
+                by_lookback.setdefault((candidate[0], entry[0]), []).append(candidate)
+        for (lookback, scored), group in by_lookback.items():
+            weights = [least_weight for _, least_weight in group]
+            _, prizes = evaluate_lookback(history, lookback, weights, pool[scored:budget], num_picks, strategy)
+            for candidate, cell_prizes in zip(group, prizes):
+                scores[candidate][0] = budget
+                scores[candidate][1] += int(cell_prizes.sum())
+        return np.array([scores[c][1] / scores[c][0] - cost for c in candidates])
+    
+    best = None
+    lookback_span = (lookback_range[1] - lookback_range[0]) / 2
+    weight_span = (weight_range[1] - weight_range[0]) / 2
+    for search_round in range(refine_rounds + 1):
+        if best is None:
+            low_lookback, high_lookback = lookback_range
+            low_weight, high_weight = weight_range
+        else:
+            low_lookback = max(lookback_range[0], int(round(best[0] - lookback_span)))
+            high_lookback = min(lookback_range[1], int(round(best[0] + lookback_span)))
+            low_weight = max(weight_range[0], best[1] - weight_span)
+            high_weight = min(weight_range[1], best[1] + weight_span)
+        lookbacks = rng.integers(low_lookback, high_lookback + 1, n_candidates)
+        weights = rng.uniform(low_weight, high_weight, n_candidates)
+        candidates = list(dict.fromkeys(zip(lookbacks.tolist(), weights.tolist())))
+        if best is not None:
+            candidates.append(best)
+        
+        for rung, budget in enumerate(budgets):
+            before = {c: scores.get(c, [0])[0] for c in candidates}
+            averages = score(candidates, budget)
+            keep = max(1, int(np.ceil(len(candidates) / eta))) if rung < n_rungs - 1 else len(candidates)
+            ranked = np.argsort(-averages, kind='stable')
+            kept = set(ranked[:keep].tolist())
+            for idx, candidate in enumerate(candidates):
+                trace.append({
+                    'Round': search_round,
+                    'Rung': rung,
+                    'Lookback': candidate[0],
+                    'Least_Weight': candidate[1],
+                    'Draws': budget,
+                    'New_Draws': budget - before[candidate],
+                    'Average_Profit': averages[idx],
+                    'Kept': idx in kept
+                })
+            candidates = [candidates[idx] for idx in ranked[:keep]]
+        
+        best = candidates[0]
+        lookback_span /= 2
+        weight_span /= 2
+    
+    # Full backtests for the best candidates over the whole pool
+    finalists = sorted((c for c, (scored, _) in scores.items() if scored == len(pool)),
+                       key=lambda c: -scores[c][1])[:n_final]
+    results = []
+    for lookback, least_weight in finalists:
+        _, prizes = evaluate_lookback(history, lookback, [least_weight], num_picks=num_picks, strategy=strategy)
+        results.append(summarize_prizes(lookback, least_weight, prizes[0], cost))
+    return pd.DataFrame(results), pd.DataFrame(trace)
+
+# Draw history attached to shared memory inside each sweep worker
+_worker_history = None
+_worker_memory = None
+
+def share_draw_history(history):
+    """Copy the numeric arrays of a DrawHistory into one shared memory block.
+
+    Returns the block and a layout of (field, shape, dtype, offset) entries
+    that attach_draw_history uses to map the arrays back without copying.
+    """
+    arrays = {
+        'draws': np.ascontiguousarray(history.draws),
+        'numbers': np.ascontiguousarray(history.numbers),
+        'additional': np.ascontiguousarray(history.additional),
+        'payouts': np.ascontiguousarray(history.payouts)
+    }
+    memory = shared_memory.SharedMemory(create=True, size=max(1, sum(a.nbytes for a in arrays.values())))
+    layout = []
+    offset = 0
+    for field, array in arrays.items():
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf, offset=offset)
+        view[...] = array
+        layout.append((field, array.shape, array.dtype.str, offset))
+        offset += array.nbytes
+    return memory, layout
+
+def attach_draw_history(name, layout):
+    """Map a DrawHistory onto a block created by share_draw_history."""
+    memory = shared_memory.SharedMemory(name=name)
+    arrays = {field: np.ndarray(shape, dtype=dtype, buffer=memory.buf, offset=offset)
+              for field, shape, dtype, offset in layout}
+    return memory, DrawHistory(dates=None, **arrays)
+
+def _init_sweep_worker(name, layout):
+    """Process pool initializer: attach the shared draw history once per worker."""
+    global _worker_history, _worker_memory
+    _worker_memory, _worker_history = attach_draw_history(name, layout)
+
+def _sweep_chunk(lookback, weights, num_picks, strategy):
+    """Process pool task: evaluate one lookback/weight chunk."""
+    return evaluate_cells(_worker_history, lookback, weights, num_picks, strategy)
+
+def parallel_sweep(history, lookbacks, weights, workers, num_picks=6, checkpoint=None, strategy=DEFAULT_STRATEGY):
+    """Evaluate the lookback x weight grid across a pool of worker processes.
+
+    The draw data is placed in shared memory once and every worker maps it
+    instead of receiving a pickled copy. Each lookback is split into weight
+    chunks so the pool stays busy on small grids. Result rows come back in
+    the same order as the serial loop in test_parameters. With a
+    SweepCheckpoint, cells it already holds are skipped and completed chunks
+    are added to it as they arrive; rows are then left in the checkpoint.
+    """
+    if not len(lookbacks) or not len(weights):
+        return []
+    chunks_per_lookback = min(len(weights), -(-4 * workers // len(lookbacks)))
+    tasks = []
+    for lookback in lookbacks:
+        remaining = checkpoint.remaining(lookback, weights) if checkpoint else weights
+        if len(remaining):
+            chunks = np.array_split(remaining, min(len(remaining), chunks_per_lookback))
+            tasks.extend((lookback, chunk) for chunk in chunks if len(chunk))
+    
+    total_combinations = len(lookbacks) * len(weights)
+    completed = total_combinations - sum(len(chunk) for _, chunk in tasks)
+    chunk_results = [None] * len(tasks)
+    if not tasks:
+        return []
+    
+    memory, layout = share_draw_history(history)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                                 initargs=(memory.name, layout)) as executor:
+            futures = {executor.submit(_sweep_chunk, lookback, chunk, num_picks, strategy): idx
+                       for idx, (lookback, chunk) in enumerate(tasks)}
+            for future in as_completed(futures):
+                idx = futures[future]
+                chunk_results[idx] = future.result()
+                completed += len(chunk_results[idx])
+                if checkpoint:
+                    checkpoint.add(chunk_results[idx])
+                lookback, chunk = tasks[idx]
+                print(f"Completed combination {completed}/{total_combinations}: "
+                      f"Lookback={lookback}, Least Weight={chunk[0]:.1f}-{chunk[-1]:.1f}")
+    finally:
+        memory.close()
+        memory.unlink()
+    
+    return [row for rows in chunk_results for row in rows]
+
+@profiled
+def plot_heatmaps(results_df, filename=HEATMAP_FILE):
     """Create heatmap visualizations of the results."""
+    plt = pyplot()
+    import seaborn as sns
+    
     # Create pivot tables for different metrics
     metrics = {
         'Average Profit per Draw ($)': 'Average_Profit',
@@ -66,11 +679,11 @@ def plot_heatmaps(results_df):
         
         # Create heatmap
         sns.heatmap(pivot_data, 
-                   annot=True, 
                    fmt='.1f' if metric != 'Net_Profit' else '.0f',
                    cmap='RdYlGn',
                    center=0,
-                   ax=axes[idx])
+                   ax=axes[idx],
+                   **annotation_kwargs(pivot_data.size))
         
         axes[idx].set_title(title)
         axes[idx].set_xlabel('Lookback Period (draws)')
@@ -78,22 +691,196 @@ def plot_heatmaps(results_df):
     
     # Adjust layout and save
     plt.tight_layout()
-    plt.savefig('toto_optimization_heatmaps.png', bbox_inches='tight', dpi=300)
+    with stage('savefig'):
+        plt.savefig(filename, bbox_inches='tight', dpi=300)
     plt.close()
 
+@profiled
+def plot_half_lives(results_df, filename=DECAY_PLOT_FILE):
+    """Plot the test_half_lives metrics against the half-life."""
+    plt = pyplot()
+    
+    metrics = {
+        'Average Profit per Draw ($)': 'Average_Profit',
+        'Win Rate (%)': 'Win_Rate',
+        'Total Net Profit ($)': 'Net_Profit'
+    }
+    
+    fig, axes = plt.subplots(1, 3, figsize=(20, 6))
+    fig.suptitle('TOTO Strategy Analysis: Exponential-Decay Half-Life', fontsize=16, y=1.05)
+    
+    for idx, (title, metric) in enumerate(metrics.items()):
+        axes[idx].plot(results_df['Half_Life'], results_df[metric], marker='.')
+        axes[idx].set_xscale('log')
+        axes[idx].set_title(title)
+        axes[idx].set_xlabel('Half-Life (draws)')
+        axes[idx].grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    with stage('savefig'):
+        plt.savefig(filename, bbox_inches='tight', dpi=300)
+    plt.close()
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Optimize TOTO strategy parameters.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of worker processes for the parameter sweep")
+    parser.add_argument('--picks', type=int, default=6,
+                        help="numbers per entry: 6 for Ordinary, 7-12 for System 7 to System 12")
+    add_strategy_argument(parser, "sweep")
+    parser.add_argument('--incremental', action='store_true',
+                        help=f"only score draws added since {RESULTS_FILE} was last written")
+    parser.add_argument('--walk-forward', action='store_true',
+                        help="evaluate the grid out of sample on successive blocks of draws")
+    parser.add_argument('--train-draws', type=int, default=500,
+                        help="draws in the first (or rolling) walk-forward training window")
+    parser.add_argument('--test-draws', type=int, default=50,
+                        help="draws in each walk-forward test block")
+    parser.add_argument('--rolling-window', action='store_true',
+                        help="train on the last --train-draws draws instead of all earlier draws")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="search lookbacks and continuous weights by successive halving")
+    parser.add_argument('--max-lookback', type=int, default=200,
+                        help="largest lookback considered by the adaptive search")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="random seed for the adaptive search")
+    parser.add_argument('--bootstrap', type=int, nargs='?', const=BOOTSTRAP_SAMPLES, metavar='SAMPLES',
+                        help="add block-bootstrap confidence intervals to the results "
+                             f"(default {BOOTSTRAP_SAMPLES} samples)")
+    parser.add_argument('--block-size', type=int, default=BOOTSTRAP_BLOCK,
+                        help="consecutive draws resampled together by --bootstrap")
+    parser.add_argument('--decay', action='store_true',
+                        help="sweep half-lives of the exponential-decay strategy instead of the grid")
+    parser.add_argument('--half-lives', type=float, nargs='+',
+                        help="half-lives in draws to sweep with --decay "
+                             f"(default: {HALF_LIFE_COUNT} from {HALF_LIFE_RANGE[0]} to {HALF_LIFE_RANGE[1]})")
+    add_profile_argument(parser, 'toto_optimize')
+    args = parser.parse_args()
+    if args.decay and args.strategy != DEFAULT_STRATEGY:
+        parser.error("--decay sweeps the exponential-decay strategy and cannot be combined with --strategy")
+    return args
+
+def report_walk_forward(history, args):
+    """Run the walk-forward evaluation and print and save its results."""
+    out_of_sample, folds = walk_forward(history, args.train_draws, args.test_draws,
+                                        expanding=not args.rolling_window, num_picks=args.picks,
+                                        strategy=args.strategy)
+    if folds.empty:
+        print(f"Not enough draws for a {args.train_draws}-draw training window")
+        return
+    
+    print("\nWalk-Forward Results:")
+    print("=" * 50)
+    print(folds.to_string(index=False))
+    
+    total_cost = len(out_of_sample) * entry_cost(args.picks)
+    net_profit = out_of_sample['Profit'].sum()
+    print(f"\nOut-of-sample draws played: {len(out_of_sample)}")
+    print(f"Out-of-sample net profit: ${net_profit}")
+    print(f"Out-of-sample win rate: {(out_of_sample['Prize'] > 0).mean() * 100:.2f}%")
+    print(f"Out-of-sample return per $1: ${net_profit / total_cost:.3f}")
+    
+    out_of_sample.to_csv(WALK_FORWARD_FILE, index=False)
+    print(f"\nOut-of-sample results have been saved to '{WALK_FORWARD_FILE}'")
+
+def report_adaptive_search(history, args):
+    """Run the adaptive search and print and save its results."""
+    results_df, trace = adaptive_search(history, (1, args.max_lookback), seed=args.seed,
+                                        num_picks=args.picks, strategy=args.strategy)
+    if results_df.empty:
+        print(f"Not enough draws for a {args.max_lookback}-draw lookback")
+        return
+    
+    print("\nAdaptive Search Results:")
+    print("=" * 50)
+    print(results_df.to_string(index=False))
+    
+    # Draw evaluations against the full 0.1-step grid over the same lookbacks
+    spent = trace['New_Draws'].sum() + results_df['Total_Draws'].sum()
+    grid = sum(len(backtest_positions(history, lookback)) for lookback in range(1, args.max_lookback + 1)) * 10
+    print(f"\nCandidates evaluated: {len(trace[trace['Rung'] == 0])}")
+    print(f"Draw evaluations: {spent} ({grid / spent:.1f}x fewer than the full grid)")
+    
+    trace.to_csv(ADAPTIVE_TRACE_FILE, index=False)
+    print(f"\nEvaluation trace has been saved to '{ADAPTIVE_TRACE_FILE}'")
+
+def report_half_lives(history, args):
+    """Run the half-life sweep and print, plot and save its results."""
+    results_df = test_half_lives(history, args.half_lives, num_picks=args.picks)
+    if results_df['Total_Draws'].max() == 0:
+        print("Not enough draws to test the exponential-decay strategy")
+        return
+    
+    render_figures([(plot_half_lives, (results_df, DECAY_PLOT_FILE), DECAY_PLOT_FILE,
+                     input_digest(results_df))])
+    
+    print("\nExponential-Decay Results:")
+    print("=" * 50)
+    print(f"Half-lives tested: {len(results_df)}")
+    for title, metric in [('Average Profit per Draw', 'Average_Profit'), ('Win Rate', 'Win_Rate'),
+                          ('Total Net Profit', 'Net_Profit')]:
+        best = results_df.loc[results_df[metric].idxmax()]
+        print(f"\nBest {title}:")
+        print(f"Half-Life: {best['Half_Life']:.2f} draws")
+        print(f"Average Profit: ${best['Average_Profit']:.2f}")
+        print(f"Win Rate: {best['Win_Rate']:.2f}%")
+        print(f"Net Profit: ${best['Net_Profit']:.0f}")
+    
+    results_df.to_csv(DECAY_RESULTS_FILE, index=False)
+    print(f"\nResults have been saved to '{DECAY_PLOT_FILE}' and '{DECAY_RESULTS_FILE}'")
+
 def main():
+    args = parse_args()
+    if args.profile:
+        enable_profiling()
     try:
         # Read the data
-        data = read_toto_data('ToTo.csv')
+        history = load_draw_history('ToTo.csv')
         
-        print("Testing parameter combinations...")
-        print("-" * 50)
+        if args.walk_forward:
+            report_walk_forward(history, args)
+            return
+        if args.adaptive:
+            report_adaptive_search(history, args)
+            return
+        if args.decay:
+            report_half_lives(history, args)
+            return
+        
+        results_df = None
+        if args.incremental:
+            results_df, last_draw, num_picks, strategy = load_results(history)
+            if results_df is None:
+                print("No saved results to update; running the full sweep")
+            elif num_picks != args.picks:
+                print(f"Saved results are for {num_picks}-number entries; running the full sweep")
+                results_df = None
+            elif strategy != args.strategy:
+                print(f"Saved results are for the {strategy} strategy; running the full sweep")
+                results_df = None
+        
+        if results_df is not None:
+            results_df, new_draws = update_parameters(history, results_df, last_draw, args.picks,
+                                                      args.strategy)
+            print(f"Added {new_draws} new draws since draw #{last_draw}")
+        else:
+            print("Testing parameter combinations...")
+            print("-" * 50)
+            
+            # Test parameter combinations
+            results_df = test_parameters(history, workers=args.workers, num_picks=args.picks,
+                                         checkpoint_file=CHECKPOINT_FILE, strategy=args.strategy)
         
-        # Test parameter combinations
-        results_df = test_parameters(data)
+        if args.bootstrap:
+            print(f"Bootstrapping {args.bootstrap} samples of {args.block_size}-draw blocks...")
+            results_df = bootstrap_intervals(history, results_df, args.bootstrap, args.block_size,
+                                             seed=args.seed, num_picks=args.picks,
+                                             strategy=args.strategy)
         
-        # Create visualizations
-        plot_heatmaps(results_df)
+        # Create visualizations, unless the plotted results are unchanged
+        plotted = results_df[['Lookback', 'Least_Weight', 'Average_Profit', 'Win_Rate', 'Net_Profit']]
+        render_figures([(plot_heatmaps, (results_df, HEATMAP_FILE), HEATMAP_FILE, input_digest(plotted))])
         
         # Find best performing combinations
         best_avg_profit = results_df.loc[results_df['Average_Profit'].idxmax()]
@@ -108,6 +895,9 @@ def main():
         print(f"Lookback Period: {best_avg_profit['Lookback']} draws")
         print(f"Least Weight: {best_avg_profit['Least_Weight']:.1f}")
         print(f"Average Profit: ${best_avg_profit['Average_Profit']:.2f}")
+        if 'Average_Profit_Low' in results_df:
+            print(f"{CONFIDENCE:.0%} Interval: ${best_avg_profit['Average_Profit_Low']:.2f} "
+                  f"to ${best_avg_profit['Average_Profit_High']:.2f}")
         print(f"Win Rate: {best_avg_profit['Win_Rate']:.2f}%")
         
         print(f"\nBest Win Rate:")
@@ -122,16 +912,21 @@ def main():
         print(f"Net Profit: ${best_net_profit['Net_Profit']:.2f}")
         print(f"Average Profit: ${best_net_profit['Average_Profit']:.2f}")
         
-        print("\nResults have been saved to 'toto_optimization_heatmaps.png'")
+        print(f"\nResults have been saved to '{HEATMAP_FILE}'")
         
         # Save results to CSV for further analysis
-        results_df.to_csv('optimization_results.csv', index=False)
-        print("Detailed results have been saved to 'optimization_results.csv'")
+        save_results(results_df, history, args.picks, args.strategy)
+        print(f"Detailed results have been saved to '{RESULTS_FILE}'")
         
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; completed combinations are kept in '{CHECKPOINT_FILE}' for the next run")
     except FileNotFoundError:
         print("Error: ToTo.csv file not found in the current directory.")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+    finally:
+        if args.profile:
+            write_profile(args.profile)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,20 +1,67 @@
+import argparse
+import os
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+from toto_profile import profiled, stage, enable_profiling, write_profile, add_profile_argument
+from toto_render import pyplot, annotation_kwargs, input_digest, render_figures
+from toto_analyzer import load_draw_history
+from toto_trend_analysis import trend_job
+from toto_random_analysis import random_entry_baseline, saved_num_picks
 
-def plot_single_heatmap(pivot_data, title, metric, filename, figsize=(12, 8)):
-    """Create a single large heatmap."""
+INSIGNIFICANT_COLOR = '#d9d9d9'
+
+def insignificant_cells(results_df, metric, num_picks=6, group_prizes=None):
+    """Whether each cell's confidence interval of metric contains the random-entry baseline.
+
+    The baseline pays group_prizes (e.g. the average prizes of the draw
+    history) or the fixed prize table. Returns None when the results have
+    no interval columns for metric (toto_optimize.py was run without
+    --bootstrap).
+    """
+    low, high = f'{metric}_Low', f'{metric}_High'
+    if low not in results_df or high not in results_df:
+        return None
+    average_profit, win_rate = random_entry_baseline(num_picks, group_prizes)
+    baseline = {
+        'Average_Profit': average_profit,
+        'Win_Rate': win_rate,
+        'Net_Profit': average_profit * results_df['Total_Draws']
+    }[metric]
+    return (results_df[low] <= baseline) & (baseline <= results_df[high])
+
+@profiled
+def plot_single_heatmap(pivot_data, title, metric, filename, figsize=(12, 8), insignificant=None):
+    """Create a single large heatmap.
+
+    Cells are annotated with smaller text as the grid grows and not at all
+    for very large grids (see annotation_kwargs). Cells marked in the
+    insignificant pivot, if given, are drawn in grey.
+    """
+    plt = pyplot()
+    import seaborn as sns
+    from matplotlib.colors import ListedColormap
+    
     plt.figure(figsize=figsize)
+    fmt = '.1f' if metric != 'Net_Profit' else '.0f'
     
     # Create heatmap
     sns.heatmap(pivot_data, 
-                annot=True, 
-                fmt='.1f' if metric != 'Net_Profit' else '.0f',
+                fmt=fmt,
                 cmap='RdYlGn',
                 center=0,
-                annot_kws={'size': 8},  # Increase annotation text size
-                cbar_kws={'label': metric})
+                vmin=np.nanmin(pivot_data.to_numpy()),
+                vmax=np.nanmax(pivot_data.to_numpy()),
+                mask=insignificant,
+                cbar_kws={'label': metric},
+                **annotation_kwargs(pivot_data.size))
+    if insignificant is not None and insignificant.to_numpy().any():
+        sns.heatmap(pivot_data,
+                    fmt=fmt,
+                    cmap=ListedColormap([INSIGNIFICANT_COLOR]),
+                    mask=~insignificant,
+                    cbar=False,
+                    **annotation_kwargs(pivot_data.size))
+        title += '\n(grey: confidence interval includes the random-entry baseline)'
     
     plt.title(title, fontsize=14, pad=20)
     plt.xlabel('Lookback Period (draws)', fontsize=12)
@@ -25,10 +72,28 @@ def plot_single_heatmap(pivot_data, title, metric, filename, figsize=(12, 8)):
     
     # Adjust layout and save
     plt.tight_layout()
-    plt.savefig(filename, bbox_inches='tight', dpi=300)
+    with stage('savefig'):
+        plt.savefig(filename, bbox_inches='tight', dpi=300)
     plt.close()
 
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Replot saved TOTO optimization results.")
+    parser.add_argument('--workers', type=int,
+                        help="rendering processes (default: one per figure, up to the CPU count)")
+    parser.add_argument('--force', action='store_true',
+                        help="redraw figures even if their input data has not changed")
+    parser.add_argument('--no-ci', action='store_true',
+                        help="colour every cell, even those not distinguishable from random entries")
+    parser.add_argument('--no-trends', action='store_true',
+                        help="skip the yearly trend figure, which needs ToTo.csv")
+    add_profile_argument(parser, 'toto_optimize_replot')
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    if args.profile:
+        enable_profiling()
     try:
         # Read the optimization results
         results_df = pd.read_csv('optimization_results.csv')
@@ -40,7 +105,13 @@ def main():
             'Total Net Profit ($)': 'Net_Profit'
         }
         
+        num_picks = saved_num_picks()
+        history = load_draw_history('ToTo.csv') if os.path.exists('ToTo.csv') else None
+        # Random entries are paid the average prizes of the draws, when available
+        group_prizes = history.payouts.mean(axis=0) if history is not None and len(history) else None
+        
         # Plot each metric in a separate heatmap
+        jobs = []
         for title, metric in metrics.items():
             pivot_data = results_df.pivot(
                 index='Least_Weight',
@@ -48,12 +119,34 @@ def main():
                 values=metric
             )
             
+            # Grey out cells whose bootstrap interval includes the random baseline
+            insignificant = None if args.no_ci else insignificant_cells(results_df, metric, num_picks,
+                                                                         group_prizes)
+            if insignificant is not None:
+                insignificant = results_df.assign(Insignificant=insignificant).pivot(
+                    index='Least_Weight',
+                    columns='Lookback',
+                    values='Insignificant'
+                ).fillna(False).astype(bool)
+            
             # Generate filename
             filename = f'toto_optimization_{metric.lower()}.png'
-            
-            # Create and save heatmap
-            plot_single_heatmap(pivot_data, title, metric, filename)
+            jobs.append((plot_single_heatmap, (pivot_data, title, metric, filename, (12, 8), insignificant),
+                         filename, input_digest(pivot_data, title, metric, insignificant)))
+        
+        # Yearly trend figure from the draw history
+        if not args.no_trends:
+            if history is not None:
+                jobs.append(trend_job(history))
+            else:
+                print("Note: ToTo.csv not found, skipping the yearly trend figure")
+        
+        # Render all figures in parallel, skipping those whose data is unchanged
+        rendered, skipped = render_figures(jobs, args.workers, args.force)
+        for filename in rendered:
             print(f"Generated {filename}")
+        for filename in skipped:
+            print(f"Unchanged {filename}")
         
         # Find and print best combinations
         best_avg_profit = results_df.loc[results_df['Average_Profit'].idxmax()]
@@ -86,6 +179,9 @@ def main():
         print("Error: optimization_results.csv file not found in the current directory.")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+    finally:
+        if args.profile:
+            write_profile(args.profile)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,134 @@
+import contextlib
+import functools
+import json
+import sys
+import time
+import tracemalloc
+
+# Profiling is off unless a script is run with --profile; while off, profiled
+# functions cost one flag check per call
+_enabled = False
+_started = None
+_stages = {}
+_stack = []
+
+def add_profile_argument(parser, script_name, note=''):
+    """Add the --profile [FILE] option, saving to <script_name>_profile.json by default."""
+    parser.add_argument('--profile', nargs='?', const=f'{script_name}_profile.json', metavar='FILE',
+                        help="record per-stage time, calls and peak memory and save them to FILE" + note)
+
+def enable_profiling(trace_memory=True):
+    """Start recording stages; trace_memory also records peak memory (slower)."""
+    global _enabled, _started
+    reset_profiling()
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _started = time.perf_counter()
+    _enabled = True
+
+def disable_profiling():
+    """Stop recording stages and memory tracing."""
+    global _enabled
+    _enabled = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def reset_profiling():
+    """Forget all recorded stages."""
+    global _started
+    _stages.clear()
+    _stack.clear()
+    _started = time.perf_counter()
+
+def _enter(name):
+    memory = tracemalloc.is_tracing()
+    if memory:
+        current, peak = tracemalloc.get_traced_memory()
+        # Keep the enclosing stage's peak before resetting it for this one
+        if _stack:
+            _stack[-1]['peak'] = max(_stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+    else:
+        current = 0
+    _stack.append({'name': name, 'start': time.perf_counter(), 'base': current, 'peak': 0, 'children': 0.0})
+
+def _exit():
+    frame = _stack.pop()
+    elapsed = time.perf_counter() - frame['start']
+    peak = frame['peak']
+    if tracemalloc.is_tracing():
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    if _stack:
+        _stack[-1]['children'] += elapsed
+        _stack[-1]['peak'] = max(_stack[-1]['peak'], peak)
+    
+    stats = _stages.setdefault(frame['name'], {'calls': 0, 'seconds': 0.0, 'self_seconds': 0.0, 'peak_bytes': 0})
+    stats['calls'] += 1
+    stats['seconds'] += elapsed
+    stats['self_seconds'] += elapsed - frame['children']
+    stats['peak_bytes'] = max(stats['peak_bytes'], peak - frame['base'])
+
+@contextlib.contextmanager
+def stage(name):
+    """Record the enclosed block as a stage."""
+    if not _enabled:
+        yield
+        return
+    _enter(name)
+    try:
+        yield
+    finally:
+        _exit()
+
+def profiled(func):
+    """Record every call of func as a stage named after it."""
+    name = func.__qualname__
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        _enter(name)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _exit()
+    return wrapper
+
+def profile_stats():
+    """Recorded stages and total wall time since profiling was enabled."""
+    return {
+        'wall_seconds': time.perf_counter() - _started if _started is not None else 0.0,
+        'memory_traced': tracemalloc.is_tracing(),
+        'stages': {name: dict(stats) for name, stats in _stages.items()}
+    }
+
+def format_profile(stats):
+    """Stage breakdown as a text table, slowest stage first.
+
+    Total time includes nested stages; self time excludes them. Peak memory
+    is the most traced memory allocated above the stage's starting point.
+    """
+    wall = stats['wall_seconds']
+    lines = [
+        f"{'Stage':<36} {'Calls':>9} {'Total s':>10} {'Self s':>10} {'% Wall':>7} {'Peak MB':>9}",
+        "-" * 86
+    ]
+    for name, stage_stats in sorted(stats['stages'].items(), key=lambda item: -item[1]['seconds']):
+        share = stage_stats['seconds'] / wall * 100 if wall > 0 else 0
+        peak = f"{stage_stats['peak_bytes'] / 2**20:9.1f}" if stats['memory_traced'] else f"{'-':>9}"
+        lines.append(f"{name:<36} {stage_stats['calls']:>9} {stage_stats['seconds']:>10.3f} "
+                     f"{stage_stats['self_seconds']:>10.3f} {share:>6.1f}% {peak}")
+    lines.append(f"Total wall time: {wall:.3f}s")
+    return "\n".join(lines)
+
+def write_profile(file_path, stream=None):
+    """Print the stage breakdown to stream (standard output by default) and save it as JSON."""
+    stream = sys.stdout if stream is None else stream
+    stats = profile_stats()
+    print("\nProfile:", file=stream)
+    print("=" * 50, file=stream)
+    print(format_profile(stats), file=stream)
+    with open(file_path, 'w') as f:
+        json.dump(stats, f, indent=2)
+    print(f"Profile has been saved to '{file_path}'", file=stream)
@@ -1,7 +1,18 @@
-import math
+import argparse
+import json
+import os
+from math import comb
 import numpy as np
-from scipy.special import comb
 import pandas as pd
+from toto_profile import profiled, enable_profiling, write_profile, add_profile_argument
+from toto_analyzer import (load_draw_history, as_draw_history, incidence_masks,
+                         additional_masks, score_masks, prize_table, entry_cost,
+                         SYSTEM_GROUP_COUNTS)
+from toto_backtest import backtest_positions
+
+RESULTS_FILE = 'optimization_results.csv'
+# Entry size and draw coverage of RESULTS_FILE, written by toto_optimize.py
+STATE_FILE = 'optimization_results.json'
 
 def calculate_theoretical_probabilities():
     """Calculate theoretical probabilities for each prize tier."""
@@ -58,6 +69,7 @@ def calculate_expected_value():
     
     return expected_value - ticket_cost
 
+@profiled
 def calculate_random_win_probabilities():
     """Calculate probabilities of winning for random guessing."""
     # Total possible combinations for 6 numbers from 1-49
@@ -117,7 +129,118 @@ def calculate_random_win_probabilities():
     
     return probabilities, total_win_prob, expected_value
 
-def main():
+def random_entry_baseline(num_picks=6, group_prizes=None):
+    """Expected profit per draw and win rate (%) of a uniformly random entry.
+
+    Uses the exact odds of each (matches, has_additional) outcome for an
+    entry of num_picks numbers, so System entries are covered too. Prizes
+    are those of prize_table, or the 7 group_prizes (e.g. the average
+    DrawHistory.payouts) when given.
+    """
+    prizes = prize_table(num_picks)
+    if group_prizes is not None:
+        prizes = SYSTEM_GROUP_COUNTS[num_picks] @ np.append(np.asarray(group_prizes, dtype=float), 0)
+    total_combinations = comb(49, num_picks)
+    expected_prize = 0.0
+    win_prob = 0.0
+    for matches in range(7):
+        for has_additional in range(2):
+            others = num_picks - matches - has_additional
+            if others < 0:
+                continue
+            prob = comb(6, matches) * comb(42, others) / total_combinations
+            expected_prize += prob * prizes[matches, has_additional]
+            if prizes[matches, has_additional] > 0:
+                win_prob += prob
+    return float(expected_prize - entry_cost(num_picks)), win_prob * 100
+
+def saved_num_picks(state_file=STATE_FILE):
+    """Numbers per entry of the saved optimization results (6 if unknown)."""
+    if not os.path.exists(state_file):
+        return 6
+    with open(state_file) as f:
+        return json.load(f).get('num_picks', 6)
+
+def random_ticket_masks(rng, shape, num_picks=6):
+    """Uniformly random num_picks-number tickets from 1-49, encoded as 64-bit masks.
+
+    Uses Floyd's sampling algorithm, so each ticket costs num_picks
+    vectorized draws and no sorting or rejection loop.
+    """
+    masks = np.zeros(shape, dtype=np.uint64)
+    for top in range(49 - num_picks, 49):
+        picks = rng.integers(0, top + 1, size=shape, dtype=np.uint64)
+        bits = np.left_shift(np.uint64(1), picks)
+        # Already picked: take the new top number instead
+        bits = np.where(masks & bits, np.left_shift(np.uint64(1), np.uint64(top)), bits)
+        masks |= bits
+    return masks
+
+@profiled
+def simulate_null_distribution(data, n_strategies=200, n_replicates=100, seed=0, lookback=1,
+                               num_picks=6):
+    """Monte Carlo null distribution of backtest results for random tickets.
+
+    A random strategy plays one uniformly random entry of num_picks numbers,
+    at its full cost, on every draw a backtest with its lookback would play.
+    lookback is one period for all strategies or an array with one per
+    strategy, so each random strategy can play the same draws as a cell of
+    the parameter grid. Each replicate scores n_strategies independent
+    random strategies against the real draw history. Every replicate has its
+    own seeded generator, so results are reproducible per seed.
+
+    Returns a dict with (n_replicates, n_strategies) arrays 'win_rate' and
+    'net_profit', their maxima over strategies 'max_win_rate' and
+    'max_net_profit', and 'n_draws', the number of draws each strategy
+    played.
+    """
+    history = as_draw_history(data)
+    lookbacks = np.broadcast_to(np.asarray(lookback), (n_strategies,))
+    positions = backtest_positions(history, int(lookbacks.min()) if n_strategies else 1)
+    winning = incidence_masks(history.numbers[positions])
+    additional = additional_masks(history.additional[positions])
+    payouts = history.payouts[positions]
+    cost = entry_cost(num_picks)
+    
+    # Draws each strategy plays: those with at least its lookback of earlier draws
+    played = history.earlier_draws(positions)[None, :] >= lookbacks[:, None]
+    n_draws = np.count_nonzero(played, axis=1)
+    
+    win_rate = np.zeros((n_replicates, n_strategies))
+    net_profit = np.zeros((n_replicates, n_strategies), dtype=np.int64)
+    generators = [np.random.default_rng(child)
+                  for child in np.random.SeedSequence(seed).spawn(n_replicates)]
+    for replicate, rng in enumerate(generators):
+        tickets = random_ticket_masks(rng, (n_strategies, len(positions)), num_picks)
+        prizes = score_masks(tickets, winning, additional, num_picks, payouts) * played
+        win_rate[replicate] = np.count_nonzero(prizes, axis=1) / np.maximum(n_draws, 1) * 100
+        net_profit[replicate] = prizes.sum(axis=1) - n_draws * cost
+    
+    return {
+        'win_rate': win_rate,
+        'net_profit': net_profit,
+        'max_win_rate': win_rate.max(axis=1),
+        'max_net_profit': net_profit.max(axis=1),
+        'n_draws': n_draws
+    }
+
+def empirical_p_value(null_values, observed):
+    """Share of null results at least as large as observed (add-one smoothed)."""
+    null_values = np.asarray(null_values).ravel()
+    return (1 + np.count_nonzero(null_values >= observed)) / (1 + len(null_values))
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Compare TOTO strategy results against random guessing.")
+    parser.add_argument('--replicates', type=int, default=100,
+                        help="number of simulated random parameter grids")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed for the random ticket simulation")
+    add_profile_argument(parser, 'toto_random_analysis')
+    return parser.parse_args()
+
+def report_random_analysis(args):
+    """Print the theoretical odds and compare saved strategy results against them."""
     probabilities, total_win_prob, expected_value = calculate_random_win_probabilities()
     
     print("TOTO Random Guess Analysis")
@@ -140,9 +263,14 @@ def main():
     print("-" * 50)
     try:
         # Load optimization results
-        results_df = pd.read_csv('optimization_results.csv')
+        results_df = pd.read_csv(RESULTS_FILE)
+        num_picks = saved_num_picks()
         best_win_rate = results_df['Win_Rate'].max()
         avg_win_rate = results_df['Win_Rate'].mean()
+        if num_picks != 6:
+            # System entries win more often than the single ticket above
+            total_win_prob = random_entry_baseline(num_picks)[1] / 100
+            print(f"Strategy entries: System {num_picks}")
         
         print(f"Random Guess Win Rate: {total_win_prob*100:.2f}%")
         print(f"Strategy Best Win Rate: {best_win_rate:.2f}%")
@@ -152,7 +280,47 @@ def main():
         print(f"Average: {(avg_win_rate/(total_win_prob*100)-1)*100:.1f}% better")
         
     except FileNotFoundError:
-        print("Note: optimization_results.csv not found for comparison")
+        print(f"Note: {RESULTS_FILE} not found for comparison")
+        return
+    
+    print("\nSignificance Against Simulated Random Grids:")
+    print("-" * 50)
+    try:
+        history = load_draw_history('ToTo.csv')
+    except FileNotFoundError:
+        print("Note: ToTo.csv not found for simulation")
+        return
+    
+    # Picking the best of many cells beats the closed-form baseline by
+    # chance, so compare against the best of as many random strategies, each
+    # playing the same draws and entry size as its cell
+    n_cells = len(results_df)
+    null = simulate_null_distribution(history, n_strategies=n_cells,
+                                      n_replicates=args.replicates, seed=args.seed,
+                                      lookback=results_df['Lookback'].to_numpy(), num_picks=num_picks)
+    best_net_profit = results_df['Net_Profit'].max()
+    if not np.array_equal(null['n_draws'], results_df['Total_Draws'].to_numpy()):
+        print(f"Note: ToTo.csv no longer matches the draws played in {RESULTS_FILE}")
+    
+    print(f"Simulated {args.replicates} grids of {n_cells} random strategies "
+          f"over {null['n_draws'].min()}-{null['n_draws'].max()} draws "
+          f"({args.replicates * int(null['n_draws'].sum()):,} entries)")
+    print(f"Random Best-of-Grid Win Rate: median {np.median(null['max_win_rate']):.2f}%, "
+          f"95th percentile {np.percentile(null['max_win_rate'], 95):.2f}%")
+    print(f"Strategy Best Win Rate p-value: {empirical_p_value(null['max_win_rate'], best_win_rate):.3f}")
+    print(f"Random Best-of-Grid Net Profit: median ${np.median(null['max_net_profit']):.0f}, "
+          f"95th percentile ${np.percentile(null['max_net_profit'], 95):.0f}")
+    print(f"Strategy Best Net Profit p-value: {empirical_p_value(null['max_net_profit'], best_net_profit):.3f}")
+
+def main():
+    args = parse_args()
+    if args.profile:
+        enable_profiling()
+    try:
+        report_random_analysis(args)
+    finally:
+        if args.profile:
+            write_profile(args.profile)
 
 if __name__ == "__main__":
     main() 
@@ -0,0 +1,88 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+# Bump when figure layouts change so figures with unchanged inputs are redrawn
+RENDER_VERSION = 1
+DIGEST_SUFFIX = '.sha256'
+# (max cells, font size): heatmaps up to max cells get annotations of that size;
+# larger grids get a colorbar only
+ANNOTATION_LIMITS = [(200, 8), (600, 6), (1200, 4)]
+
+def pyplot():
+    """matplotlib.pyplot on the non-interactive Agg backend."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def annotation_kwargs(n_cells):
+    """seaborn heatmap annotation options for a grid of n_cells."""
+    for max_cells, size in ANNOTATION_LIMITS:
+        if n_cells <= max_cells:
+            return {'annot': True, 'annot_kws': {'size': size}}
+    return {'annot': False}
+
+def _update_digest(digest, part):
+    if hasattr(part, 'columns'):
+        for values in (part.index.to_numpy(), part.columns.to_numpy(), part.to_numpy()):
+            _update_digest(digest, values)
+    elif isinstance(part, dict):
+        for key in sorted(part):
+            _update_digest(digest, key)
+            _update_digest(digest, part[key])
+    elif isinstance(part, np.ndarray) and part.dtype != object:
+        digest.update(f"{part.dtype}{part.shape}".encode())
+        digest.update(np.ascontiguousarray(part).tobytes())
+    elif isinstance(part, np.ndarray):
+        digest.update(repr(part.tolist()).encode())
+    else:
+        digest.update(repr(part).encode())
+
+def input_digest(*parts):
+    """SHA-256 of a figure's inputs: DataFrames, arrays, dicts of them and plain values."""
+    digest = hashlib.sha256(str(RENDER_VERSION).encode())
+    for part in parts:
+        _update_digest(digest, part)
+    return digest.hexdigest()
+
+def is_current(filename, digest):
+    """Whether filename exists and was rendered from inputs with this digest."""
+    sidecar = filename + DIGEST_SUFFIX
+    if not (os.path.exists(filename) and os.path.exists(sidecar)):
+        return False
+    with open(sidecar) as f:
+        return f.read().strip() == digest
+
+def _mark_rendered(filename, digest):
+    with open(filename + DIGEST_SUFFIX, 'w') as f:
+        f.write(digest + '\n')
+
+def render_figures(jobs, workers=None, force=False):
+    """Render figures, in parallel worker processes when there are several.
+
+    Each job is (func, args, filename, digest): func(*args) must save the
+    figure to filename. Jobs whose figure was already rendered from inputs
+    with the same digest are skipped unless force is set. Workers default to
+    one per job up to the CPU count. Returns the rendered and skipped
+    filenames.
+    """
+    current = [not force and is_current(filename, digest) for _, _, filename, digest in jobs]
+    pending = [job for job, done in zip(jobs, current) if not done]
+    skipped = [job[2] for job, done in zip(jobs, current) if done]
+    workers = min(len(pending), workers or os.cpu_count() or 1)
+    
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=pyplot) as executor:
+            futures = {executor.submit(func, *args): (filename, digest)
+                       for func, args, filename, digest in pending}
+            for future in as_completed(futures):
+                future.result()
+                _mark_rendered(*futures[future])
+    else:
+        pyplot()
+        for func, args, filename, digest in pending:
+            func(*args)
+            _mark_rendered(filename, digest)
+    return [job[2] for job in pending], skipped
@@ -0,0 +1,310 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from toto_profile import profiled, enable_profiling, write_profile, add_profile_argument
+from toto_analyzer import (load_draw_history, drawn_incidence, rolling_window_counts,
+                           rolling_first_seen_order, entry_cost, MIN_PICKS, MAX_PICKS)
+from toto_backtest import backtest_positions, score_window_state, weighted_tickets
+
+DEFAULT_PORT = 8765
+# Window state of this many lookback periods is kept warm
+MAX_CACHED_LOOKBACKS = 32
+# Requests arriving within this many seconds of each other share a batch
+BATCH_WINDOW = 0.005
+
+class SuggestionService:
+    """Draw history and window sums held in memory, answering queries in batches.
+
+    Queries are submitted from any thread and answered by a single worker
+    thread, which collects the queries arriving within batch_window of each
+    other and answers all queries for the same lookback period with one
+    vectorized pass. Before each batch the CSV is checked and reloaded if it
+    has changed. The window state cache is guarded by a lock, since status()
+    reads it from the HTTP handler threads.
+    """
+    
+    def __init__(self, file_path, max_cached_lookbacks=MAX_CACHED_LOOKBACKS, batch_window=BATCH_WINDOW):
+        self.file_path = file_path
+        self.max_cached_lookbacks = max_cached_lookbacks
+        self.batch_window = batch_window
+        self.batches = 0
+        self.queries = 0
+        self._states = OrderedDict()
+        self._states_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._load()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+    
+    def _signature(self):
+        stat = os.stat(self.file_path)
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _load(self):
+        self._loaded_signature = self._signature()
+        self.history = load_draw_history(self.file_path)
+        with self._states_lock:
+            self._states.clear()
+    
+    def reload_if_changed(self):
+        """Reload the history if the CSV changed since it was loaded; return whether it did."""
+        if self._signature() == self._loaded_signature:
+            return False
+        self._load()
+        return True
+    
+    @profiled
+    def window_state(self, lookback):
+        """Window state of every draw plus the next one for a lookback period.
+
+        Row 0 is the upcoming draw after the latest in the history, whose
+        window is the latest lookback draws; row i + 1 is the draw at
+        position i of the history.
+        """
+        with self._states_lock:
+            if lookback in self._states:
+                self._states.move_to_end(lookback)
+                return self._states[lookback]
+    
+        history = self.history
+        drawn = np.vstack([np.zeros((1, 49), dtype=np.uint8), drawn_incidence(history)])
+        additional = np.append(0, history.additional)
+        plain, indexed, window_size = rolling_window_counts(drawn, lookback)
+        order = rolling_first_seen_order(drawn, additional, window_size)
+        state = (plain, indexed, window_size, order)
+        with self._states_lock:
+            self._states[lookback] = state
+            if len(self._states) > self.max_cached_lookbacks:
+                self._states.popitem(last=False)
+        return state
+    
+    def submit(self, kind, params):
+        """Queue a 'suggest' or 'backtest' query and wait for its answer."""
+        future = Future()
+        self._queue.put((kind, params, future))
+        return future.result()
+    
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._answer(batch)
+    
+    def _answer(self, batch):
+        """Answer a batch of queries, grouping them by lookback period."""
+        try:
+            self.reload_if_changed()
+        except Exception as e:
+            print(f"Reload of {self.file_path} failed, keeping the loaded draws: {str(e)}")
+        self.batches += 1
+        self.queries += len(batch)
+    
+        groups = {}
+        for kind, params, future in batch:
+            try:
+                params = validate_query(kind, params)
+            except KeyError as e:
+                future.set_exception(ValueError(f"Missing parameter {str(e)}"))
+                continue
+            except ValueError as e:
+                future.set_exception(e)
+                continue
+            if kind == 'suggest':
+                key = (kind, params['lookback'], params['picks'])
+            else:
+                key = (kind, params['lookback'], params['picks'], params['start_draw'], params['end_draw'])
+            groups.setdefault(key, []).append((params, future))
+    
+        for key, queries in groups.items():
+            try:
+                if key[0] == 'suggest':
+                    self._suggest(queries)
+                else:
+                    self._backtest(queries)
+            except Exception as e:
+                for _, future in queries:
+                    if not future.done():
+                        future.set_exception(e)
+    
+    @profiled
+    def _suggest(self, queries):
+        """Suggested numbers for queries sharing a lookback period and pick count."""
+        history = self.history
+        lookback, num_picks = queries[0][0]['lookback'], queries[0][0]['picks']
+        plain, indexed, window_size, order = self.window_state(lookback)
+    
+        rows, weights, answered = [], [], []
+        for params, future in queries:
+            draw = params['draw']
+            if draw == int(history.draws[0]) + 1:
+                row = 0
+            elif draw in history:
+                row = history.position(draw) + 1
+            else:
+                future.set_exception(ValueError(f"Draw {draw} not found in data"))
+                continue
+            if window_size[row] == 0:
+                future.set_exception(ValueError(f"No draws before draw {draw}"))
+                continue
+            rows.append(row)
+            weights.append(params['weight'])
+            answered.append((params, future))
+        if not rows:
+            return
+    
+        rows = np.array(rows)
+        state = (plain[rows], indexed[rows], window_size[rows], order[rows])
+        tickets = weighted_tickets(state, np.array(weights)[:, None], num_picks)
+        for (params, future), row, ticket in zip(answered, rows, tickets):
+            future.set_result({
+                'draw': params['draw'],
+                'lookback': params['lookback'],
+                'weight': params['weight'],
+                'window_draws': int(window_size[row]),
+                'numbers': ticket.tolist()
+            })
+    
+    @profiled
+    def _backtest(self, queries):
+        """Backtest summaries for queries sharing a lookback period, pick count and draw range."""
+        history = self.history
+        first = queries[0][0]
+        lookback, num_picks = first['lookback'], first['picks']
+        positions = backtest_positions(history, lookback, first['start_draw'], first['end_draw'])
+        plain, indexed, window_size, order = self.window_state(lookback)
+        rows = positions + 1
+        state = (plain[rows], indexed[rows], window_size[rows], order[rows])
+    
+        weights = [params['weight'] for params, _ in queries]
+        prizes = score_window_state(state, history.numbers[positions], history.additional[positions],
+                                    weights, num_picks, history.payouts[positions])
+        cost = entry_cost(num_picks)
+        for (params, future), cell_prizes in zip(queries, prizes):
+            total_cost = len(cell_prizes) * cost
+            total_prize = int(cell_prizes.sum())
+            wins = int(np.count_nonzero(cell_prizes))
+            future.set_result({
+                'lookback': lookback,
+                'weight': params['weight'],
+                'picks': num_picks,
+                'total_draws': len(cell_prizes),
+                'total_cost': total_cost,
+                'total_prize': total_prize,
+                'net_profit': total_prize - total_cost,
+                'wins': wins,
+                'win_rate': wins / len(cell_prizes) * 100 if len(cell_prizes) else 0.0
+            })
+    
+    def status(self):
+        """Loaded history and batching counters."""
+        history = self.history
+        with self._states_lock:
+            cached_lookbacks = list(self._states)
+        return {
+            'file': self.file_path,
+            'draws': len(history),
+            'latest_draw': int(history.draws[0]) if len(history) else None,
+            'cached_lookbacks': cached_lookbacks,
+            'batches': self.batches,
+            'queries': self.queries
+        }
+
+def validate_query(kind, params):
+    """Typed query parameters with defaults; raises KeyError or ValueError."""
+    query = {
+        'lookback': int(params['lookback']),
+        'weight': float(params.get('weight', 0.1)),
+        'picks': int(params.get('picks', MIN_PICKS))
+    }
+    if query['lookback'] < 1:
+        raise ValueError("lookback must be at least 1")
+    if not np.isfinite(query['weight']):
+        raise ValueError("weight must be a finite number")
+    if not MIN_PICKS <= query['picks'] <= MAX_PICKS:
+        raise ValueError(f"picks must be between {MIN_PICKS} and {MAX_PICKS}")
+    if kind == 'suggest':
+        query['draw'] = int(params['draw'])
+    else:
+        query['start_draw'] = int(params['start_draw']) if params.get('start_draw') else None
+        query['end_draw'] = int(params['end_draw']) if params.get('end_draw') else None
+    return query
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """JSON over HTTP: GET /suggest, /backtest and /status."""
+    
+    service = None
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == '/status':
+                self._send(200, self.service.status())
+            elif url.path in ('/suggest', '/backtest'):
+                self._send(200, self.service.submit(url.path[1:], params))
+            else:
+                self._send(404, {'error': f"Unknown path {url.path}"})
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            self._send(500, {'error': str(e)})
+    
+    def _send(self, code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Serve TOTO suggestions and backtests from memory.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help="localhost port to listen on")
+    parser.add_argument('--file', default='ToTo.csv',
+                        help="draw history CSV, reloaded whenever it changes")
+    add_profile_argument(parser, 'toto_service', " when the service stops")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.profile:
+        enable_profiling()
+    try:
+        ServiceHandler.service = SuggestionService(args.file)
+        server = ThreadingHTTPServer(('127.0.0.1', args.port), ServiceHandler)
+        print(f"Serving {len(ServiceHandler.service.history)} draws on http://127.0.0.1:{args.port}")
+        print("Endpoints: /suggest?draw=&lookback=&weight=, /backtest?lookback=&weight=, /status")
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nService stopped")
+    except FileNotFoundError:
+        print(f"Error: {args.file} file not found in the current directory.")
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+    finally:
+        if args.profile:
+            write_profile(args.profile)
+
+if __name__ == "__main__":
+    main()
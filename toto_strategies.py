@@ -0,0 +1,176 @@
+import numpy as np
+from toto_profile import profiled
+from toto_analyzer import drawn_incidence, rolling_first_seen_order, suggest_tickets, score_tickets
+from toto_backtest import (rolling_window_state, weighted_tickets, playable_positions, DEFAULT_STRATEGY,
+                          MAX_BATCH_ELEMENTS)
+
+# Strategy name -> batch kernel, filled by register_strategy
+STRATEGIES = {}
+# Earlier draws first searched for each number's last appearance; doubled
+# until every number is found or the history runs out
+GAP_SPAN = 128
+# Rows of draws a kernel is asked for at once; the frequency arrays of a
+# block hold about MAX_BATCH_ELEMENTS elements
+KERNEL_BLOCK_ROWS = max(1, MAX_BATCH_ELEMENTS // 49)
+
+def register_strategy(name):
+    """Register a batch kernel as a strategy under name.
+
+    A kernel is called as kernel(history, lookback, weights, num_picks,
+    start, stop) and returns a (len(weights), stop - start, num_picks) uint8
+    array holding the sorted ticket for every draw at rows start:stop of the
+    history (stop None for all rows) and every weight. Row i may only use
+    draws older than row i; rows of draws with fewer than lookback earlier
+    draws are never scored. Kernels see a whole range of draws at once, so
+    they should be built from array passes over the range (rolling window
+    sums, accumulations) rather than a loop over draws, and should only
+    read the draws the range needs, as rolling_window_state does, so that
+    scoring a few new draws stays cheap. Ranges are at most
+    KERNEL_BLOCK_ROWS rows long.
+    """
+    def decorator(kernel):
+        STRATEGIES[name] = kernel
+        return kernel
+    return decorator
+
+def get_strategy(name):
+    """The batch kernel registered under name."""
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {name} (choose from {', '.join(STRATEGIES)})")
+    return STRATEGIES[name]
+
+def add_strategy_argument(parser, action):
+    """Add a --strategy option accepting any registered strategy to an argparse parser."""
+    parser.add_argument('--strategy', default=DEFAULT_STRATEGY, choices=list(STRATEGIES),
+                        help=f"registered strategy to {action} (default: {DEFAULT_STRATEGY})")
+
+def _per_weight(tickets, weights):
+    """Repeat the tickets of a strategy that ignores the weight for every weight."""
+    return np.broadcast_to(tickets, (len(weights),) + tickets.shape)
+
+def _gap_state(history, start=0, stop=None):
+    """Draws since each number was last drawn before every draw at rows start:stop, and a tie-break key.
+
+    Numbers never drawn before a draw get a gap of all its earlier draws.
+    Only the earlier draws up to the last appearance of every number are
+    read, searched in spans starting at GAP_SPAN draws.
+    """
+    stop = len(history) if stop is None else stop
+    span = GAP_SPAN
+    while True:
+        window_stop = min(stop + span, len(history))
+        drawn = drawn_incidence(history, start, window_stop)
+        # All earlier draws held in the block, which is all of them once it reaches the oldest draw
+        window_size = np.arange(window_stop - start)[::-1]
+        order = rolling_first_seen_order(drawn, history.additional[start:window_stop], window_size)
+        gap = order[:stop - start] // 100
+        if window_stop == len(history) or (gap < window_size[:stop - start, None]).all():
+            return gap, np.broadcast_to(np.arange(1, 50), gap.shape)
+        span *= 2
+
+@register_strategy(DEFAULT_STRATEGY)
+@profiled
+def weighted_kernel(history, lookback, weights, num_picks=6, start=0, stop=None):
+    """Most frequent numbers of the window, linearly weighted down to the least weight.
+
+    evaluate_lookback and run_backtest play this strategy natively; both
+    pick their tickets with weighted_tickets, as this kernel does.
+    """
+    state = rolling_window_state(history, lookback, start, stop)
+    tickets = np.zeros((len(weights), len(state[0]), num_picks), dtype=np.uint8)
+    for idx, least_weight in enumerate(weights):
+        tickets[idx] = weighted_tickets(state, least_weight, num_picks)
+    return tickets
+
+@register_strategy('hot')
+@profiled
+def hot_kernel(history, lookback, weights, num_picks=6, start=0, stop=None):
+    """Most frequent numbers of the window, every draw counting the same; weight is unused."""
+    plain, _, _, order = rolling_window_state(history, lookback, start, stop)
+    return _per_weight(suggest_tickets(plain, order, num_picks), weights)
+
+@register_strategy('cold')
+@profiled
+def cold_kernel(history, lookback, weights, num_picks=6, start=0, stop=None):
+    """Least frequent numbers of the window, longest absent first on ties; weight is unused."""
+    plain, _, _, order = rolling_window_state(history, lookback, start, stop)
+    # Reverse the first-seen row, keeping the additional and number parts of the
+    # key; suggest_tickets needs tie-break keys of 0 or more
+    cold_order = (lookback - order // 100) * 100 + order % 100
+    return _per_weight(suggest_tickets(-plain, cold_order, num_picks), weights)
+
+@register_strategy('gap')
+@profiled
+def gap_kernel(history, lookback, weights, num_picks=6, start=0, stop=None):
+    """Numbers with the longest gap since last drawn, over all earlier draws.
+
+    The lookback only sets how many earlier draws a draw needs to be played;
+    weight is unused.
+    """
+    gap, order = _gap_state(history, start, stop)
+    return _per_weight(suggest_tickets(gap, order, num_picks), weights)
+
+@register_strategy('mixed')
+@profiled
+def mixed_kernel(history, lookback, weights, num_picks=6, start=0, stop=None):
+    """The weight's share of picks from the hot numbers, the rest from the longest gaps."""
+    plain, _, _, order = rolling_window_state(history, lookback, start, stop)
+    gap, gap_order = _gap_state(history, start, stop)
+    rows = np.arange(len(plain))[:, None]
+    tickets = np.zeros((len(weights), len(plain), num_picks), dtype=np.uint8)
+    for idx, weight in enumerate(weights):
+        n_hot = int(round(min(max(weight, 0), 1) * num_picks))
+        picked = np.zeros((len(plain), 0), dtype=np.uint8)
+        remaining = gap
+        if n_hot:
+            picked = suggest_tickets(plain, order, n_hot)
+            # Hot picks cannot be picked again for their gap
+            remaining = gap.astype(float)
+            remaining[rows, picked.astype(np.intp) - 1] = -np.inf
+        if n_hot < num_picks:
+            picked = np.hstack([picked, suggest_tickets(remaining, gap_order, num_picks - n_hot)])
+        tickets[idx] = np.sort(picked, axis=1)
+    return tickets
+
+def _kernel_tickets(history, strategy, lookback, weights, positions, num_picks):
+    """Kernel tickets for the draws at positions, computed over the row ranges they span.
+
+    The kernel is called on blocks of at most KERNEL_BLOCK_ROWS rows, so
+    the (rows, 49) window state it builds stays bounded like the batches
+    of score_window_state; rows without played draws between blocks are
+    skipped.
+    """
+    kernel = get_strategy(strategy)
+    tickets = np.zeros((len(weights), len(positions), num_picks), dtype=np.uint8)
+    order = np.argsort(positions, kind='stable')
+    ordered = positions[order]
+    begin = 0
+    while begin < len(ordered):
+        start = int(ordered[begin])
+        end = int(np.searchsorted(ordered, start + KERNEL_BLOCK_ROWS))
+        block = ordered[begin:end]
+        block_tickets = kernel(history, lookback, weights, num_picks, start, int(block[-1]) + 1)
+        tickets[:, order[begin:end]] = block_tickets[:, block - start]
+        begin = end
+    return tickets
+
+def strategy_tickets(history, strategy, lookback, least_weight, positions, num_picks=6):
+    """Tickets of a registered strategy for the draws at positions."""
+    return _kernel_tickets(history, strategy, lookback, [least_weight], np.asarray(positions), num_picks)[0]
+
+@profiled
+def evaluate_strategy(history, strategy, lookback, weights, positions=None, num_picks=6):
+    """evaluate_lookback for any registered strategy.
+
+    The strategy's kernel produces the tickets of the row range spanned by
+    the played draws for all weights in one call, so scoring only the newest
+    draws (as update_parameters does) only reads the draws they need. The
+    played draws are scored in one batch.
+    Returns the row positions of the played draws and a
+    (len(weights), len(positions)) prize array.
+    """
+    positions = playable_positions(history, lookback, positions)
+    tickets = _kernel_tickets(history, strategy, lookback, weights, positions, num_picks)
+    prizes = score_tickets(tickets, history.numbers[positions], history.additional[positions],
+                           history.payouts[positions])
+    return positions, prizes
@@ -1,73 +1,93 @@
-import pandas as pd
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-from toto_backtest import run_backtest
-from toto_analyzer import read_toto_data
+from toto_profile import profiled, stage, enable_profiling, write_profile, add_profile_argument
+from toto_analyzer import load_draw_history, as_draw_history, entry_cost
+from toto_backtest import evaluate_lookback, DEFAULT_STRATEGY
+from toto_strategies import add_strategy_argument
+from toto_render import pyplot, input_digest, render_figures
 
-def analyze_yearly_trends(data, lookback_periods=[1, 2, 3, 5, 7], least_weights=[0.5]):
-    """Analyze win rate trends by year for different parameter combinations."""
-    # Convert date to datetime
-    data['Date'] = pd.to_datetime(data['Date'], format='%d/%m/%Y')
+# Configurations plotted by default
+TREND_LOOKBACKS = [1, 2, 3, 4, 5, 6, 7]
+TREND_WEIGHTS = [0.5]
+TREND_FILE = 'toto_yearly_trends.png'
+
+@profiled
+def analyze_yearly_trends(data, lookback_periods=[1, 2, 3, 5, 7], least_weights=[0.5], num_picks=6,
+                          strategy=DEFAULT_STRATEGY):
+    """Analyze win rate trends by year for different parameter combinations.
+
+    Every configuration is scored in one batched pass per lookback period
+    and grouped by year with a single bincount. strategy selects any
+    registered strategy (see toto_strategies). Returns a dict with the
+    per-configuration 'lookback' and 'weight' arrays, the 'years', and
+    (configuration x year) matrices 'win_count', 'total_count', 'win_rate'
+    (percent) and 'profit'.
+    """
+    # Dates are parsed once by the loader
+    history = as_draw_history(data)
+    cost = entry_cost(num_picks)
+    
+    years = history.dates.astype('datetime64[Y]').astype(np.int64) + 1970
+    unique_years, year_idx = np.unique(years, return_inverse=True)
+    n_years = len(unique_years)
     
-    results = []
+    lookbacks = np.repeat(lookback_periods, len(least_weights))
+    weights = np.tile(np.asarray(least_weights, dtype=float), len(lookback_periods))
+    shape = (len(lookbacks), n_years)
+    win_count = np.zeros(shape, dtype=np.int64)
+    total_count = np.zeros(shape, dtype=np.int64)
+    profit = np.zeros(shape, dtype=np.int64)
     
-    # Test each combination
-    for lookback in lookback_periods:
-        for weight in least_weights:
-            print(f"Processing: Lookback={lookback}, Weight={weight}")
-            
-            # Run backtest
-            backtest_results, _, _, _ = run_backtest(data, lookback, least_weight=weight)
-            
-            # Convert results to DataFrame
-            df_results = pd.DataFrame(backtest_results)
-            df_results['Date'] = pd.to_datetime(df_results['Date'], format='%d/%m/%Y')
-            df_results['Year'] = df_results['Date'].dt.year
-            df_results['Win'] = df_results['Prize'] > 0
-            
-            # Calculate yearly win rates and win counts
-            yearly_stats = df_results.groupby('Year').agg({
-                'Win': ['mean', 'sum', 'count']
-            }).reset_index()
-            yearly_stats.columns = ['Year', 'win_rate', 'win_count', 'total_count']
-            yearly_stats['win_rate'] = yearly_stats['win_rate'] * 100
-            
-            # Store results
-            results.append({
-                'lookback': lookback,
-                'weight': weight,
-                'years': yearly_stats['Year'],
-                'win_rates': yearly_stats['win_rate'],
-                'win_counts': yearly_stats['win_count'],
-                'total_counts': yearly_stats['total_count']
-            })
+    for idx, lookback in enumerate(lookback_periods):
+        print(f"Processing: Lookback={lookback}, Weights={len(least_weights)}")
+        positions, prizes = evaluate_lookback(history, lookback, least_weights, num_picks=num_picks,
+                                              strategy=strategy)
+        
+        # One bincount over (weight, year) pairs covers every weight of this lookback
+        cells = (np.arange(len(least_weights))[:, None] * n_years + year_idx[positions]).ravel()
+        size = len(least_weights) * n_years
+        rows = slice(idx * len(least_weights), (idx + 1) * len(least_weights))
+        total_count[rows] = np.bincount(cells, minlength=size).reshape(-1, n_years)
+        win_count[rows] = np.bincount(cells, weights=(prizes > 0).ravel(), minlength=size).reshape(-1, n_years)
+        profit[rows] = np.bincount(cells, weights=prizes.ravel(), minlength=size).reshape(-1, n_years)
+    profit -= total_count * cost
     
-    return results
+    return {
+        'lookback': lookbacks,
+        'weight': weights,
+        'years': unique_years,
+        'win_count': win_count,
+        'total_count': total_count,
+        'win_rate': win_count / np.maximum(total_count, 1) * 100,
+        'profit': profit
+    }
 
-def plot_yearly_trends(results):
+@profiled
+def plot_yearly_trends(results, filename=TREND_FILE):
     """Create subplots showing yearly win rates and win counts for all configurations."""
+    plt = pyplot()
+    
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 12), height_ratios=[1, 1])
     
-    # Get unique years across all results
-    all_years = sorted(list(set(year for r in results for year in r['years'])))
+    # Only years that any configuration played
+    played = results['total_count'] > 0
+    year_mask = played.any(axis=0)
+    all_years = results['years'][year_mask]
+    played = played[:, year_mask]
+    win_rates = results['win_rate'][:, year_mask]
+    win_counts = results['win_count'][:, year_mask]
     
     # Calculate bar positions
-    n_configs = len(results)
+    n_configs = len(results['lookback'])
     bar_width = 0.8 / n_configs
+    labels = [f"Lookback={lookback}, Weight={weight:.1f}"
+              for lookback, weight in zip(results['lookback'], results['weight'])]
     
     # Plot win rates (top subplot)
-    for i, result in enumerate(results):
+    for i in range(n_configs):
         x_positions = np.arange(len(all_years)) + (i * bar_width) - (bar_width * (n_configs-1)/2)
-        
-        # Create a mask for years present in this result
-        mask = [year in result['years'].values for year in all_years]
-        win_rates = [result['win_rates'].values[result['years'] == year][0] if year in result['years'].values else 0 for year in all_years]
-        
-        ax1.bar(x_positions[mask], 
-                [w for m, w in zip(mask, win_rates) if m],
-                width=bar_width,
-                label=f"Lookback={result['lookback']}, Weight={result['weight']:.1f}",
-                alpha=0.8)
+        mask = played[i]
+        ax1.bar(x_positions[mask], win_rates[i, mask], width=bar_width, label=labels[i], alpha=0.8)
     
     ax1.set_title('Yearly Win Rates by Strategy Configuration', fontsize=14, pad=20)
     ax1.set_xlabel('Year', fontsize=12)
@@ -84,18 +104,10 @@ def plot_yearly_trends(results):
                 label='Random Guess (2.179%)')
     
     # Plot win counts (bottom subplot)
-    for i, result in enumerate(results):
+    for i in range(n_configs):
         x_positions = np.arange(len(all_years)) + (i * bar_width) - (bar_width * (n_configs-1)/2)
-        
-        # Create a mask for years present in this result
-        mask = [year in result['years'].values for year in all_years]
-        win_counts = [result['win_counts'].values[result['years'] == year][0] if year in result['years'].values else 0 for year in all_years]
-        
-        ax2.bar(x_positions[mask], 
-                [c for m, c in zip(mask, win_counts) if m],
-                width=bar_width,
-                label=f"Lookback={result['lookback']}, Weight={result['weight']:.1f}",
-                alpha=0.8)
+        mask = played[i]
+        ax2.bar(x_positions[mask], win_counts[i, mask], width=bar_width, label=labels[i], alpha=0.8)
     
     ax2.set_title('Total Number of Winning Draws per Year', fontsize=14, pad=20)
     ax2.set_xlabel('Year', fontsize=12)
@@ -108,31 +120,52 @@ def plot_yearly_trends(results):
     ax2.set_xticklabels(all_years, rotation=45)
     
     plt.tight_layout()
-    plt.savefig('toto_yearly_trends.png', bbox_inches='tight', dpi=300)
+    with stage('savefig'):
+        plt.savefig(filename, bbox_inches='tight', dpi=300)
     plt.close()
 
+def trend_job(history, lookback_periods=TREND_LOOKBACKS, least_weights=TREND_WEIGHTS, filename=TREND_FILE,
+              strategy=DEFAULT_STRATEGY):
+    """render_figures job drawing the yearly trends of the given configurations."""
+    results = analyze_yearly_trends(history, lookback_periods, least_weights, strategy=strategy)
+    return plot_yearly_trends, (results, filename), filename, input_digest(results)
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Plot yearly win rates of TOTO strategy configurations.")
+    add_strategy_argument(parser, "plot")
+    parser.add_argument('--force', action='store_true',
+                        help="redraw the figure even if the trends have not changed")
+    add_profile_argument(parser, 'toto_trend_analysis')
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    if args.profile:
+        enable_profiling()
     try:
         # Read the data
-        data = read_toto_data('ToTo.csv')
-        
-        # Define parameters to analyze
-        lookback_periods = [1, 2, 3, 4, 5, 6, 7]  # Short, medium, long term
-        least_weights = [0.5]  # Low, medium, high weights
+        history = load_draw_history('ToTo.csv')
         
         print("Analyzing yearly trends...")
-        results = analyze_yearly_trends(data, lookback_periods, least_weights)
+        job = trend_job(history, strategy=args.strategy)
         
         print("Generating plot...")
-        plot_yearly_trends(results)
+        rendered, _ = render_figures([job], force=args.force)
         
         print("\nTrend analysis complete!")
-        print("Generated plot saved as 'toto_yearly_trends.png'")
+        if rendered:
+            print(f"Generated plot saved as '{TREND_FILE}'")
+        else:
+            print(f"Trends unchanged, keeping '{TREND_FILE}'")
         
     except FileNotFoundError:
         print("Error: ToTo.csv file not found in the current directory.")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+    finally:
+        if args.profile:
+            write_profile(args.profile)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file